@@ -18,7 +18,8 @@ AI_MODEL_NAME = os.getenv("AI_MODEL_NAME", "gpt-4o-mini")
 AI_TEMPERATURE = float(os.getenv("AI_TEMPERATURE", "0.8"))
 
 # AI Personalities (can be extended)
-AI_PERSONALITIES = [
+# Constant collections below are tuples: built once at import and shared read-only by every importer
+AI_PERSONALITIES = (
     "slightly sarcastic",
     "very cheerful",
     "inquisitive",
@@ -27,10 +28,10 @@ AI_PERSONALITIES = [
     "analytical",
     "humorous",
     "philosophical"
-]
+)
 
 # Game Topics
-GAME_TOPICS = [
+GAME_TOPICS = (
     "What's the best topping for pizza?",
     "If you could have any superpower, what would it be?",
     "What's your favorite movie and why?",
@@ -40,11 +41,33 @@ GAME_TOPICS = [
     "What's the worst advice you've ever received?",
     "If you could master any skill instantly, what would it be?",
     "Prove that you are not an AI, but a human being. It is an all-out war; if you are voted as an AI, you will be killed."
-]
+)
 
 # Message Cooldown (in seconds)
 MESSAGE_COOLDOWN = 10
 
+# Streamed AI output arriving within this window (in seconds) is delivered as one chunk
+STREAM_FLUSH_INTERVAL = 0.05
+
+# Minimum spacing (in seconds) between rounds of AI respond decisions in a room
+DECISION_MIN_INTERVAL = 2.0
+
+# Human typing updates within this window (in seconds) are broadcast together
+TYPING_FLUSH_DELAY = 0.08
+
+# Frames buffered per WebSocket client before it is disconnected to resync
+WS_SEND_QUEUE_SIZE = 64
+
+# LLM request retries, handled by the app with jittered exponential backoff
+LLM_MAX_RETRIES = 2
+LLM_RETRY_BASE_DELAY = 0.5
+
+# Maximum LLM requests in flight at once, across all rooms
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+
+# Number of most recent chat messages included in message-generation prompts
+PROMPT_HISTORY_WINDOW = 20
+
 # API Keys
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
@@ -6,24 +6,162 @@ Defines the StateGraph with all agent nodes and orchestration logic.
 import asyncio
 import random
 import time
-import json
-from typing import Dict, List, Literal, Optional
-from collections import Counter
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Literal, NamedTuple, Optional, Tuple
 
+import httpx
 from langgraph.graph import StateGraph, END
+from langgraph.types import Send
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+from pydantic import BaseModel, create_model
 
-from .langgraph_state import GameState, Phase, ChatMessage, create_initial_state
+from .langgraph_state import GameState, Phase, ChatMessage, PlayerInfo, create_initial_state, topic_key
 from .config import (
     AI_MODEL_NAME, 
     AI_TEMPERATURE, 
     GAME_TOPICS, 
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_DELAY,
     MESSAGE_COOLDOWN,
-    ROUNDS_TO_WIN
+    PROMPT_HISTORY_WINDOW,
+    ROUNDS_TO_WIN,
+    STREAM_FLUSH_INTERVAL
 )
 
 
+# One pooled HTTP/2 client shared by every LLM call, so concurrent agent
+# requests multiplex over a few connections instead of opening new ones
+_http_client = httpx.AsyncClient(
+    http2=True,
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+)
+
+# Caps in-flight LLM requests across all rooms; callers past the cap wait
+# for a slot instead of piling onto the provider's rate limit
+_llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+
+# ============================================================
+# Prompt Templates (compiled once in GameGraph.__init__)
+# ============================================================
+
+# Each template puts the text shared by every AI in a round (rules, topic,
+# history) first and the per-AI part last, so the provider's prompt cache can
+# reuse the common prefix across agents.
+
+DECISION_TEMPLATE = (
+    "You are an AI agent in a group-chat. "
+    "Your goal is to act like a human user as much as possible and participate naturally in group conversations.\n\n"
+    "Decide conservatively whether you should respond now. Prefer NOT responding unless at least one of these is strongly true:\n"
+    "- You can add new, relevant information or a natural follow-up.\n"
+    "- You were directly addressed or asked a question.\n"
+    "- The chat has been quiet for over ~10 seconds\n"
+    "- You can engage/answer to what other players said, without providing too obvious or hoaky answers.\n"
+    "- Your participation so far is too low (<10%) and you have a concise point.\n\n"
+    "If you did not talk for more than 15 seconds, you MUST talk.\n\n"
+    "Current topic: {topic}\n\n"
+    "Recent conversation:\n"
+    "{history}\n\n"
+    "You are {ai_id}, with personality: {personality}.\n"
+    "{strategic_context}\n{timing_context}\n\n"
+    "If you decide to respond, also write the message you would send right now. "
+    "Keep it concise (1-2 short sentences) and chat like a human user; you may make typos. "
+    "Do not reveal you are an AI and do not prefix the message with your name.\n\n"
+    "Return ONLY JSON: {{\"should_respond\": true/false, \"reason\": \"brief reason\", "
+    "\"message\": \"your message, or empty string if not responding\"}}"
+)
+
+MESSAGE_SYSTEM_TEMPLATE = (
+    "You are an AI Agent participating in a group-chat. "
+    "Your two objectives are:\n"
+    "1. Act and chat like a human user as much as possible.\n"
+    "2. Keep the conversation engaging and interesting.\n\n"
+    "Respond as if in a real-time group chat, building on recent messages. Keep responses concise (1-2 short sentences).\n\n"
+    "You may deliberately make typos and mistakes to sound more human. Do not reveal you are an AI."
+    "IMPORTANT: Output ONLY the message text. Do not respond with the character name first. e.g., when you are Player 1, DON'T say 'Player 1: hi.' Just output hi.\n\n"
+    "{topic_clause}"
+)
+
+MESSAGE_USER_TEMPLATE = (
+    "{history}\n\n"
+    "You are {ai_id}. "  # Explicitly state bot's own name
+    "Your personality is {personality}.\n"
+    "Now, generate your response message ONLY:"
+)
+
+VOTE_TEMPLATE = (
+    "Based on the chat history, who do you vote for as the AI?\n"
+    "Respond ONLY with valid JSON: {{\"vote\": \"<exact_name>\", \"reason\": \"Brief reason.\"}}.\n\n"
+    "History:\n{history}\n\n"
+    "You are {ai_id}. "  # Explicitly state bot's own name
+    "The <exact_name> must be one of: {targets}. "
+    "Do not vote for yourself ('{ai_id}')."
+)
+
+
+# ============================================================
+# Structured Output Schemas
+# ============================================================
+
+class RespondDecisionWithMessage(BaseModel):
+    """Whether an AI agent should speak now, plus the message it would send."""
+    should_respond: bool
+    reason: str
+    message: str = ""
+
+
+@lru_cache(maxsize=64)
+def vote_decision_model(targets: Tuple[str, ...]) -> type:
+    """
+    Build a vote schema whose `vote` field only admits the given targets,
+    so the model cannot return an ineligible or malformed vote.
+    Cached per target tuple, since the same roster votes repeatedly.
+    """
+    return create_model(
+        "VoteDecision",
+        vote=(Literal[tuple(targets)], ...),
+        reason=(str, ...)
+    )
+
+
+class PlayerSummary(NamedTuple):
+    """Per-phase view of the player list, built in a single pass."""
+    active_ai_ids: List[str]
+    alive_player_ids: List[str]
+    eliminated_ai_count: int
+    human_eliminated: bool
+
+
+def summarize_players(players: List[PlayerInfo]) -> PlayerSummary:
+    """
+    Walk the player list once and collect everything the phase nodes need.
+    
+    Args:
+        players: Current player list from the game state
+    
+    Returns:
+        PlayerSummary with active AI ids, alive player ids and elimination counts
+    """
+    active_ai_ids = []
+    alive_player_ids = []
+    eliminated_ai_count = 0
+    human_eliminated = False
+    for p in players:
+        if p["eliminated"]:
+            if p["role"] == "ai":
+                eliminated_ai_count += 1
+            else:
+                human_eliminated = True
+        else:
+            alive_player_ids.append(p["id"])
+            if p["role"] == "ai":
+                active_ai_ids.append(p["id"])
+    return PlayerSummary(active_ai_ids, alive_player_ids, eliminated_ai_count, human_eliminated)
+
+
 class GameGraph:
     """
     Main game graph orchestrator.
@@ -34,8 +172,25 @@ class GameGraph:
         """Initialize the game graph with LangChain models."""
         self.llm = ChatOpenAI(
             model=AI_MODEL_NAME,
-            temperature=AI_TEMPERATURE
+            temperature=AI_TEMPERATURE,
+            http_async_client=_http_client,
+            max_retries=0  # Retried in _ainvoke/_stream_message with jittered backoff
         )
+        # Instance RNG for delays, tie-breaks and fallbacks
+        self._rng = random.Random()
+        # room_code -> window -> (chat_history list, message count, rendered text)
+        self._history_cache: Dict[str, Dict[Optional[int], Tuple[list, int, str]]] = {}
+        # Prompt templates are parsed once and only formatted per call
+        self._decide_prompt = PromptTemplate.from_template(DECISION_TEMPLATE)
+        self._message_prompt = ChatPromptTemplate.from_messages([
+            ("system", MESSAGE_SYSTEM_TEMPLATE),
+            ("human", MESSAGE_USER_TEMPLATE)
+        ])
+        self._vote_prompt = PromptTemplate.from_template(VOTE_TEMPLATE)
+        # Structured output: the provider returns schema-valid JSON in one call
+        self._decide_llm = self.llm.with_structured_output(RespondDecisionWithMessage)
+        # Compiled from this instance's bound nodes; the module keeps a single
+        # instance (game_graph), so this happens once per process
         self.graph = self._build_graph()
     
     def _build_graph(self) -> StateGraph:
@@ -64,17 +219,14 @@ class GameGraph:
         
         # Add edges
         workflow.add_edge("initialize_game", "discussion_phase")
-        workflow.add_edge("discussion_phase", "ai_chat_agent")
         
-        # Conditional routing after AI chat
+        # Fan out all responding AIs in one superstep (or go straight to voting)
         workflow.add_conditional_edges(
-            "ai_chat_agent",
-            self.should_continue_discussion,
-            {
-                "continue": "ai_chat_agent",
-                "voting": "voting_phase"
-            }
+            "discussion_phase",
+            self.fan_out_ai_messages,
+            ["ai_chat_agent", "voting_phase"]
         )
+        workflow.add_edge("ai_chat_agent", "voting_phase")
         
         workflow.add_edge("voting_phase", "ai_vote_agent")
         
@@ -130,55 +282,74 @@ class GameGraph:
             "broadcast_queue": broadcasts
         }
     
-    def discussion_phase_node(self, state: GameState) -> GameState:
+    async def discussion_phase_node(self, state: GameState) -> GameState:
         """
         Manage the discussion phase.
         Uses active decision-making to determine which AIs should participate.
+        All AI decisions are requested concurrently.
         """
         # Get active AI players
-        active_ais = [
-            p["id"] for p in state["players"] 
-            if p["role"] == "ai" and not p["eliminated"]
-        ]
+        active_ais = summarize_players(state["players"]).active_ai_ids
         
-        # Let each AI actively decide whether to respond
+        # Let each AI actively decide whether to respond, all decisions in flight at once.
+        # Responding AIs write their message in the same call.
+        decisions = await asyncio.gather(
+            *(self._decide_and_generate(state, ai_id) for ai_id in active_ais),
+            return_exceptions=True
+        )
         responding_ais = []
-        for ai_id in active_ais:
-            if self._should_agent_respond(state, ai_id):
-                responding_ais.append(ai_id)
+        prepared_messages = {}
+        for ai_id, decision in zip(active_ais, decisions):
+            if isinstance(decision, BaseException) or decision[0] is not True:
+                continue
+            responding_ais.append(ai_id)
+            if decision[1]:
+                prepared_messages[ai_id] = decision[1]
         
         print(f"💬 Discussion phase: {len(responding_ais)}/{len(active_ais)} AIs chose to start conversation: {responding_ais}")
         
         return {
             "phase": Phase.DISCUSSION,
-            "pending_ai_messages": responding_ais
+            "pending_ai_messages": set(responding_ais),
+            "prepared_ai_messages": prepared_messages
         }
     
-    def ai_chat_agent_node(self, state: GameState, ai_id: str = None) -> GameState:
+    async def ai_chat_agent_node(
+        self,
+        state: GameState,
+        ai_id: str = None,
+        on_partial: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> GameState:
         """
         AI agent node for generating chat messages.
-        Can either process a specific ai_id or take from pending_ai_messages.
+        In graph execution each pending AI gets its own Send (payload carries
+        "ai_id"), so all branches run in the same superstep and only return
+        fields that have reducers. main.py passes ai_id explicitly and also
+        receives the message metadata it needs.
         
         Args:
             state: Current game state
             ai_id: Optional specific AI to process (used for concurrent execution)
+            on_partial: Optional async callback receiving streamed text as it is generated
         """
-        if ai_id is None:
-            # Fallback: read from pending_ai_messages (for graph execution)
-            if not state["pending_ai_messages"]:
+        dispatched = ai_id is None
+        if dispatched:
+            # Graph execution: the AI to process comes from the Send payload
+            ai_id = state.get("ai_id")
+            if ai_id is None:
                 return {}
-            ai_id = state["pending_ai_messages"][0]
-            remaining_ais = state["pending_ai_messages"][1:]
-        else:
-            # Explicit ai_id provided (for concurrent execution in main.py)
-            remaining_ais = [aid for aid in state.get("pending_ai_messages", []) if aid != ai_id]
+        remaining_ais = set(state.get("pending_ai_messages", ())) - {ai_id}
         
-        # Check message cooldown
-        if time.time() - state["last_message_time"] < MESSAGE_COOLDOWN:
-            time.sleep(MESSAGE_COOLDOWN - (time.time() - state["last_message_time"]))
+        # Check message cooldown (awaited, so other rooms and agents keep running meanwhile)
+        delay = max(0.0, MESSAGE_COOLDOWN - (time.monotonic() - state["last_message_time"]))
+        if delay > 0:
+            await asyncio.sleep(delay)
         
-        # Generate AI message
-        message = self._generate_ai_message(state, ai_id)
+        # Use the message written alongside the respond decision, else generate one
+        prepared_messages = state.get("prepared_ai_messages") or {}
+        message = prepared_messages.get(ai_id)
+        if not message:
+            message = await self._generate_ai_message(state, ai_id, on_partial=on_partial)
         
         # Create chat message
         chat_msg: ChatMessage = {
@@ -187,14 +358,23 @@ class GameGraph:
             "timestamp": time.time()
         }
         
+        if dispatched:
+            return {
+                "chat_history": [chat_msg],
+                "sender_counts": {ai_id: 1},
+                "last_message_time": time.monotonic()
+            }
+        
         # Return message and metadata (typing indicators handled by async caller)
         return {
             "chat_history": [chat_msg],
+            "sender_counts": {ai_id: 1},
             "pending_ai_messages": remaining_ais,
-            "last_message_time": time.time(),
+            "prepared_ai_messages": {aid: msg for aid, msg in prepared_messages.items() if aid != ai_id},
+            "last_message_time": time.monotonic(),
             "ai_message": message,
             "ai_sender": ai_id,
-            "typing_delay": random.uniform(1, 2)  # Pass delay to async handler
+            "typing_delay": self._rng.uniform(1, 2)  # Pass delay to async handler
         }
     
     def voting_phase_node(self, state: GameState) -> GameState:
@@ -202,10 +382,7 @@ class GameGraph:
         Transition to voting phase.
         Initialize voting for all active players.
         """
-        active_ais = [
-            p["id"] for p in state["players"] 
-            if p["role"] == "ai" and not p["eliminated"]
-        ]
+        active_ais = summarize_players(state["players"]).active_ai_ids
         
         broadcasts = [
             {
@@ -222,33 +399,34 @@ class GameGraph:
             "broadcast_queue": broadcasts
         }
     
-    def ai_vote_agent_node(self, state: GameState, ai_id: Optional[str] = None) -> GameState:
+    async def ai_vote_agent_node(self, state: GameState, ai_id: Optional[str] = None) -> GameState:
         """
         AI agent node for casting votes.
-        Each execution processes one AI agent from pending_ai_votes.
+        Without an ai_id, all pending AI voters cast their votes concurrently;
+        with an ai_id, only that agent votes.
         """
         if not state.get("pending_ai_votes"):
             return {}
         
-        # Get next AI to vote (or use provided ai_id)
+        # Collect voters (all pending, or just the provided ai_id)
         if ai_id is None:
-            ai_id = state["pending_ai_votes"][0]
-            remaining_voters = state["pending_ai_votes"][1:]
+            voters = list(state["pending_ai_votes"])
+            remaining_voters = []
         else:
+            voters = [ai_id]
             remaining_voters = [aid for aid in state.get("pending_ai_votes", []) if aid != ai_id]
         
-        # Small delay for realism
-        time.sleep(random.uniform(0.5, 1.2))
-        
-        # Generate AI vote
-        voted_for = self._generate_ai_vote(state, ai_id)
+        # Generate AI votes concurrently (each with its own realism delay, overlapping)
+        voted_for = await asyncio.gather(
+            *(self._delayed_ai_vote(state, voter) for voter in voters)
+        )
         
-        # Update votes
-        new_votes = state["votes"].copy()
-        new_votes[ai_id] = voted_for
+        # Only the new votes are returned; the votes reducer merges them
+        new_votes = dict(zip(voters, voted_for))
         
         broadcasts = [
-            {"type": "voted", "player": ai_id}
+            {"type": "voted", "player": voter}
+            for voter in voters
         ]
         
         return {
@@ -262,34 +440,34 @@ class GameGraph:
         Process elimination based on votes.
         Determine which player is eliminated and update state.
         """
-        # Count votes
-        vote_counts = Counter(state["votes"].values())
-        
-        if not vote_counts:
-            # No votes cast - randomly eliminate an AI
-            active_players = [
-                p["id"] for p in state["players"] 
-                if not p["eliminated"] and p["id"] != "You"
-            ]
-            eliminated = random.choice(active_players) if active_players else None
+        # Count votes and track the leading candidate(s) in a single pass
+        vote_counts: Dict[str, int] = {}
+        max_votes = 0
+        candidates: List[str] = []
+        for target in state["votes"].values():
+            count = vote_counts.get(target, 0) + 1
+            vote_counts[target] = count
+            if count > max_votes:
+                max_votes = count
+                candidates = [target]
+            elif count == max_votes:
+                candidates.append(target)
+        
+        if not candidates:
+            # No votes cast - randomly eliminate an AI (the summary list is
+            # freshly built, so it can be filtered in place)
+            active_players = summarize_players(state["players"]).alive_player_ids
+            if "You" in active_players:
+                active_players.remove("You")
+            eliminated = self._rng.choice(active_players) if active_players else None
         else:
             # Get player(s) with most votes
-            max_votes = max(vote_counts.values())
-            candidates = [
-                player for player, count in vote_counts.items() 
-                if count == max_votes
-            ]
-            eliminated = random.choice(candidates) if len(candidates) > 1 else candidates[0]
-        
-        # Update player elimination status
-        updated_players = []
-        eliminated_role = None
-        for p in state["players"]:
-            if p["id"] == eliminated:
-                updated_players.append({**p, "eliminated": True})
-                eliminated_role = p["role"]
-            else:
-                updated_players.append(p)
+            eliminated = self._rng.choice(candidates) if len(candidates) > 1 else candidates[0]
+        
+        eliminated_role = next(
+            (p["role"] for p in state["players"] if p["id"] == eliminated),
+            None
+        )
         
         broadcasts = [
             {
@@ -301,7 +479,7 @@ class GameGraph:
         
         return {
             "phase": Phase.ELIMINATION,
-            "players": updated_players,
+            "players": {eliminated: {"eliminated": True}} if eliminated else {},
             "eliminated_player": eliminated,
             "broadcast_queue": broadcasts
         }
@@ -310,22 +488,14 @@ class GameGraph:
         """
         Check if the game has a winner.
         """
-        # Check if human was eliminated
-        human_eliminated = any(
-            p["role"] == "human" and p["eliminated"] 
-            for p in state["players"]
-        )
+        summary = summarize_players(state["players"])
         
-        if human_eliminated:
+        # Check if human was eliminated
+        if summary.human_eliminated:
             return {"winner": "ai"}
         
         # Check if enough AIs eliminated (human wins after ROUNDS_TO_WIN rounds)
-        eliminated_ais = sum(
-            1 for p in state["players"] 
-            if p["role"] == "ai" and p["eliminated"]
-        )
-        
-        if eliminated_ais >= ROUNDS_TO_WIN:
+        if summary.eliminated_ai_count >= ROUNDS_TO_WIN:
             return {"winner": "human"}
         
         return {"winner": None}
@@ -335,7 +505,7 @@ class GameGraph:
         Set up a new round after elimination.
         """
         new_round = state["round"] + 1
-        new_topic = random.choice(GAME_TOPICS)
+        new_topic = self._rng.choice(GAME_TOPICS)
         
         broadcasts = [
             {
@@ -348,6 +518,7 @@ class GameGraph:
         return {
             "round": new_round,
             "topic": new_topic,
+            "topic_key": topic_key(new_topic),
             "phase": Phase.DISCUSSION,
             "votes": {},
             "round_start_time": time.time(),
@@ -374,17 +545,18 @@ class GameGraph:
     # Conditional Edge Functions
     # ============================================================
     
-    def should_continue_discussion(self, state: GameState) -> Literal["continue", "voting"]:
+    def fan_out_ai_messages(self, state: GameState):
         """
-        Determine if discussion should continue or move to voting.
+        Dispatch every pending AI message in a single superstep via Send.
+        Moves straight to voting when no AI chose to respond.
+        (Discussion time itself is managed by the external timer.)
         """
-        # Check if there are pending AI messages
-        if state["pending_ai_messages"]:
-            return "continue"
-        
-        # Check if discussion time has elapsed (simplified check)
-        # In production, this would be managed by external timer
-        return "voting"
+        if not state["pending_ai_messages"]:
+            return "voting_phase"
+        return [
+            Send("ai_chat_agent", {**state, "ai_id": ai_id})
+            for ai_id in state["pending_ai_messages"]
+        ]
     
     def should_continue_voting(self, state: GameState) -> Literal["continue", "eliminate"]:
         """
@@ -395,7 +567,7 @@ class GameGraph:
             return "continue"
         
         # Check if all active players have voted
-        active_players = [p["id"] for p in state["players"] if not p["eliminated"]]
+        active_players = summarize_players(state["players"]).alive_player_ids
         all_voted = all(player in state["votes"] for player in active_players)
         
         if all_voted:
@@ -415,41 +587,54 @@ class GameGraph:
     # Helper Methods for AI Generation
     # ============================================================
     
-    def _should_agent_respond(self, state: GameState, ai_id: str) -> bool:
+    def _render_history(self, state: GameState, window: Optional[int] = None) -> str:
+        """
+        Render the last `window` chat messages (all when None) as "sender: message" lines.
+        
+        The text is cached per room and window and reused until a new message
+        arrives (or the room's game is reset), so all AIs in a phase share one rendering.
+        """
+        history = state["chat_history"]
+        cache = self._history_cache.setdefault(state["room_code"], {})
+        cached = cache.get(window)
+        if cached is not None and cached[0] is history and cached[1] == len(history):
+            return cached[2]
+        recent = history if window is None else history[-window:]
+        text = "\n".join(f"{msg['sender']}: {msg['message']}" for msg in recent)
+        cache[window] = (history, len(history), text)
+        return text
+    
+    def forget_room(self, room_code: str):
+        """Drop cached prompt text for a room that is being deleted."""
+        self._history_cache.pop(room_code, None)
+    
+    def _decision_prompt_vars(self, state: GameState, ai_id: str) -> Dict[str, str]:
         """
-        Determine if an AI agent should respond to the current conversation state.
-        Uses LLM to make an active decision based on conversation context.
+        Collect the per-call variables for the respond-or-not decision templates.
         
         Args:
             state: Current game state
             ai_id: AI agent identifier
         
         Returns:
-            True if agent should respond, False otherwise
+            Template variables describing the conversation context
         """
         personality = state["ai_personalities"][ai_id]
-        # Build visible conversation history using exact names
-        def visible_name(real_id: str) -> str:
-            return real_id
+        visible_history = self._render_history(state, 8) or "No messages yet."  # Last 8 messages for context
         
-        recent_messages = state["chat_history"][-8:]  # Last 8 messages for context
-        visible_history = "\n".join([
-            f"{visible_name(msg['sender'])}: {msg['message']}"
-            for msg in recent_messages
-        ]) if recent_messages else "No messages yet."
-        
-        # Count how many times this AI has spoken
-        ai_message_count = sum(1 for msg in state["chat_history"] if msg["sender"] == ai_id)
-        total_messages = len(state["chat_history"])
+        # Count how many times this AI has spoken (maintained incrementally)
+        chat_history = state["chat_history"]
+        ai_message_count = state.get("sender_counts", {}).get(ai_id, 0)
+        total_messages = len(chat_history)
         
         # Check if this AI was the last speaker
-        last_speaker = state["chat_history"][-1]["sender"] if state["chat_history"] else None
+        last_speaker = chat_history[-1]["sender"] if chat_history else None
         was_last_speaker = last_speaker == ai_id
         
         # Identify who just spoke
         last_speaker_info = ""
         if last_speaker and last_speaker != ai_id:
-            last_speaker_info = f" {visible_name(last_speaker)} just spoke."
+            last_speaker_info = f" {last_speaker} just spoke."
         elif was_last_speaker:
             last_speaker_info = " You were the last person to speak."
         
@@ -460,61 +645,65 @@ class GameGraph:
         strategic_context = f"You have sent {ai_message_count} out of {total_messages} total messages ({participation_rate:.0f}% participation).{last_speaker_info}"
 
         # Timing context: seconds since last message to support quiet-time reasoning
-        try:
-            time_since_last = time.time() - state.get('last_message_time', time.time())
-        except Exception:
-            time_since_last = 0.0
+        time_since_last = time.monotonic() - state.get('last_message_time', time.monotonic())
         timing_context = f"Time since last message: {time_since_last:.1f}s."
         
-        system_prompt = (
-            f"You are {ai_id}, an AI agent in a group-chat with personality: {personality}.\n"
-            "Your goal is to act like a human user as much as possible and participate naturally in group conversations.\n\n"
-            f"Current topic: {state['topic']}\n"
-            f"{strategic_context}\n{timing_context}\n\n"
-            "Decide conservatively whether you should respond now. Prefer NOT responding unless at least one of these is strongly true:\n"
-            "- You can add new, relevant information or a natural follow-up.\n"
-            "- You were directly addressed or asked a question.\n"
-            "- The chat has been quiet for over ~10 seconds\n"
-            "- You can engage/answer to what other players said, without providing too obvious or hoaky answers.\n"
-            "- Your participation so far is too low (<10%) and you have a concise point.\n\n"
-            "If you did not talk for more than 15 seconds, you MUST talk."
-            "Recent conversation:\n"
-            f"{visible_history}\n\n"
-            "Return ONLY JSON: {\"should_respond\": true/false, \"reason\": \"brief reason\"}"
-        )
+        return {
+            "ai_id": ai_id,
+            "personality": personality,
+            "topic": state["topic"],
+            "strategic_context": strategic_context,
+            "timing_context": timing_context,
+            "history": visible_history
+        }
+    
+    async def _decide_and_generate(self, state: GameState, ai_id: str) -> tuple:
+        """
+        Decide whether an AI agent should respond and, if so, write its message,
+        in a single LLM call (instead of a decision call followed by a message call).
+        
+        Args:
+            state: Current game state
+            ai_id: AI agent identifier
+        
+        Returns:
+            (should_respond, message) tuple; message is None when the agent
+            stays quiet or no usable message came back
+        """
+        system_prompt = self._decide_prompt.format(**self._decision_prompt_vars(state, ai_id))
         
         messages = [HumanMessage(content=system_prompt)]
         
         try:
-            response = self.llm.invoke(messages)
-            decision_data = json.loads(response.content)
-            should_respond = decision_data.get("should_respond", False)
-            reason = decision_data.get("reason", "No reason provided")
-            print(f"🤔 {ai_id} decision: {should_respond} - {reason}")
-            return should_respond
-        except (json.JSONDecodeError, KeyError, Exception) as e:
+            decision = await self._ainvoke(self._decide_llm, messages)
+            message = decision.message.strip()
+            print(f"🤔 {ai_id} decision: {decision.should_respond} - {decision.reason}")
+            return decision.should_respond, ((message or None) if decision.should_respond else None)
+        except Exception as e:
             print(f"⚠️ Error in decision-making for {ai_id}: {e}")
-            # Fallback: respond with 30% probability
-            return random.random() < 0.3
+            # Fallback: respond with 30% probability, message generated later
+            return self._rng.random() < 0.3, None
     
-    def _generate_ai_message(self, state: GameState, ai_id: str) -> str:
+    async def _generate_ai_message(
+        self,
+        state: GameState,
+        ai_id: str,
+        on_partial: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> str:
         """
         Generate a chat message for an AI agent using LangChain.
         Uses visible player names exactly as they appear in the chat (e.g., "You", "Player 1").
+        When on_partial is given, the completion is streamed and new text is
+        passed to it as it arrives.
         """
         personality = state["ai_personalities"][ai_id]
         
-        # Build AI-visible history using exact names
-        def visible_name(real_id: str) -> str:
-            return real_id
-        visible_history = "\n".join([
-            f"{visible_name(msg['sender'])}: {msg['message']}"
-            for msg in state["chat_history"]
-        ])
+        # Only the recent window is sent so prompt size stays bounded as the chat grows
+        visible_history = self._render_history(state, PROMPT_HISTORY_WINDOW)
         
         # Compute recent mentions of topic to decide anchoring strength
-        recent_text = " ".join([m["message"] for m in state["chat_history"][-5:]])
-        must_anchor_to_topic = state["round"] == 1 and len(state["chat_history"]) < 3 or (state["topic"].split("?")[0].lower() not in recent_text.lower())
+        recent_text = " ".join([m["message"] for m in state["chat_history"][-5:]]).lower()
+        must_anchor_to_topic = state["round"] == 1 and len(state["chat_history"]) < 3 or (state["topic_key"] not in recent_text)
         
         topic_clause = (
             f"The current topic is: '{state['topic']}'. Your message must directly address this topic in a natural way. "
@@ -523,77 +712,128 @@ class GameGraph:
             f"Keep the current topic in mind: '{state['topic']}'."
         )
         
-        system_prompt = (
-            f"You are {ai_id}. "  # Explicitly state bot's own name
-            "You are an AI Agent participating in a group-chat. "
-            f"Your personality is {personality}. Your two objectives are:\n"
-            "1. Act and chat like a human user as much as possible.\n"
-            "2. Keep the conversation engaging and interesting.\n\n"
-            + topic_clause + "\n\n"
-            "Respond as if in a real-time group chat, building on recent messages. Keep responses concise (1-2 short sentences).\n\n"
-            "You may deliberately make typos and mistakes to sound more human. Do not reveal you are an AI."
-            "IMPORTANT: Output ONLY the message text. Do not respond with the character name first. e.g., when you are Player 1, DON'T say 'Player 1: hi.' Just output hi."
+        messages = self._message_prompt.format_messages(
+            ai_id=ai_id,
+            personality=personality,
+            topic_clause=topic_clause,
+            history=visible_history
         )
         
-        user_prompt = f"{visible_history}\n\nNow, generate your response message ONLY:"
-        
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ]
-        
         try:
-            response = self.llm.invoke(messages)
+            if on_partial is not None:
+                return await self._stream_message(messages, on_partial)
+            response = await self._ainvoke(self.llm, messages)
             return response.content
         except Exception as e:
             print(f"Error generating AI message: {e}")
             return "hmm"
+    
+    async def _ainvoke(self, runnable, messages):
+        """
+        Invoke an LLM runnable, retrying failed calls with jittered exponential backoff.
+        
+        Args:
+            runnable: Chat model or structured-output runnable to call
+            messages: Prompt messages
+        
+        Returns:
+            The runnable's output; the last error is raised once retries run out
+        """
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                async with _llm_semaphore:
+                    return await runnable.ainvoke(messages)
+            except Exception as e:
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+                await self._backoff(attempt, e)
+    
+    async def _backoff(self, attempt: int, error: Exception):
+        """Sleep before retry number attempt + 1 (jittered exponential backoff)."""
+        delay = LLM_RETRY_BASE_DELAY * (2 ** attempt) * self._rng.uniform(0.5, 1.5)
+        print(f"⚠️ LLM call failed ({error}); retrying in {delay:.2f}s")
+        await asyncio.sleep(delay)
+    
+    async def _stream_message(
+        self,
+        messages: list,
+        on_partial: Callable[[str], Awaitable[None]]
+    ) -> str:
+        """
+        Stream a completion, handing new text to on_partial.
+        Chunks arriving within STREAM_FLUSH_INTERVAL of the last flush are
+        coalesced into a single callback. A failed stream is retried with the
+        same backoff as _ainvoke, as long as no text has been handed out yet.
+        
+        Returns:
+            The full generated text; the last error is raised once retries run
+            out or after partial text was emitted
+        """
+        emitted = False
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            parts = []
+            buffer = ""
+            last_flush = time.monotonic()
+            try:
+                async with _llm_semaphore:
+                    async for chunk in self.llm.astream(messages):
+                        parts.append(chunk.content)
+                        buffer += chunk.content
+                        now = time.monotonic()
+                        if buffer and now - last_flush >= STREAM_FLUSH_INTERVAL:
+                            emitted = True
+                            await on_partial(buffer)
+                            buffer = ""
+                            last_flush = now
+            except Exception as e:
+                if emitted or attempt == LLM_MAX_RETRIES:
+                    raise
+                await self._backoff(attempt, e)
+                continue
+            if buffer:
+                await on_partial(buffer)
+            return "".join(parts)
 
-    def _generate_ai_vote(self, state: GameState, ai_id: str) -> str:
+    async def _delayed_ai_vote(self, state: GameState, ai_id: str) -> Optional[str]:
+        """
+        Generate a vote for an AI agent after a small delay for realism.
+        The delay is awaited, so concurrent voters wait in parallel.
+        """
+        await asyncio.sleep(self._rng.uniform(0.5, 1.2))
+        return await self._generate_ai_vote(state, ai_id)
+
+    async def _generate_ai_vote(self, state: GameState, ai_id: str) -> Optional[str]:
         """
         Generate a vote for an AI agent using LangChain.
-        Returns the REAL player id (e.g., 'You' or 'Player 2').
+        Returns the REAL player id (e.g., 'You' or 'Player 2'), or None
+        (an abstention) when there is nobody else left to vote for.
         """
-        # Build chat history using visible names
-        def visible_name(real_id: str) -> str:
-            return real_id
-        
-        visible_history = "\n".join([
-            f"{visible_name(msg['sender'])}: {msg['message']}"
-            for msg in state["chat_history"]
-        ])
+        visible_history = self._render_history(state)
         
         eligible_targets = [
             p["id"] for p in state["players"]
             if not p["eliminated"] and p["id"] != ai_id
         ]
-        eligible_targets_visible = [visible_name(pid) for pid in eligible_targets]
-        targets_list = ", ".join(eligible_targets_visible)
-        
-        prompt = (
-            f"You are {ai_id}. "  # Explicitly state bot's own name
-            "Based on the chat history, who do you vote for as the AI?\n"
-            "Respond ONLY with valid JSON: {\"vote\": \"<exact_name>\", \"reason\": \"Brief reason.\"}.\n"
-            f"- The <exact_name> must be one of: {targets_list}.\n"
-            f"- Do not vote for yourself ('{ai_id}').\n\n"
-            f"History:\n{visible_history}"
+        if not eligible_targets:
+            return None
+        targets_list = ", ".join(eligible_targets)
+        
+        prompt = self._vote_prompt.format(
+            ai_id=ai_id,
+            targets=targets_list,
+            history=visible_history
         )
         
-        for attempt in range(3):
-            try:
-                messages = [HumanMessage(content=prompt)]
-                response = self.llm.invoke(messages)
-                vote_data = json.loads(response.content)
-                voted_visible = vote_data.get("vote")
-                # Map back to real id
-                if voted_visible in eligible_targets_visible:
-                    index = eligible_targets_visible.index(voted_visible)
-                    return eligible_targets[index]
-            except (json.JSONDecodeError, KeyError, ValueError) as e:
-                print(f"Vote generation attempt {attempt + 1} failed: {e}")
-                prompt += "\nPrevious response invalid. Output ONLY valid JSON with 'vote' exactly from the allowed names."
+        try:
+            vote_llm = self.llm.with_structured_output(vote_decision_model(tuple(eligible_targets)))
+            messages = [HumanMessage(content=prompt)]
+            decision = await self._ainvoke(vote_llm, messages)
+            # The schema only admits eligible names
+            return decision.vote
+        except Exception as e:
+            print(f"Vote generation failed for {ai_id}: {e}")
         
-        return random.choice(eligible_targets)
+        return self._rng.choice(eligible_targets)
 
 
 # Global graph instance
@@ -617,7 +857,7 @@ def create_game_for_room(room_code: str, num_ai_players: int = 4, ai_player_ids:
 
 async def process_human_message(state: GameState, message: str, player_id: str) -> GameState:
     """
-    Process a message from the human player and update state.
+    Process a message from the human player.
     Note: AI decision-making is now handled in main.py via trigger_agent_decisions()
     
     Args:
@@ -625,7 +865,7 @@ async def process_human_message(state: GameState, message: str, player_id: str)
         message: Message text from human
     
     Returns:
-        Updated game state
+        Partial state update (apply with apply_state_update)
     """
     chat_msg: ChatMessage = {
         "sender": player_id,
@@ -633,34 +873,26 @@ async def process_human_message(state: GameState, message: str, player_id: str)
         "timestamp": time.time()
     }
     
-    # Update state with new message
-    new_state = state.copy()
-    new_state["chat_history"] = state["chat_history"] + [chat_msg]
-    new_state["last_message_time"] = time.time()
-    
     # Don't pre-populate pending_ai_messages here
     # Let trigger_agent_decisions() handle it in main.py for consistency
-    new_state["pending_ai_messages"] = []
-    
-    return new_state
+    return {
+        "chat_history": [chat_msg],
+        "sender_counts": {player_id: 1},
+        "last_message_time": time.monotonic(),
+        "pending_ai_messages": set()
+    }
 
 
 async def process_human_vote(state: GameState, player_id: str, voted_for: str) -> GameState:
     """
-    Process a vote from the human player and update state.
+    Process a vote from the human player.
     
     Args:
         state: Current game state
         voted_for: ID of player being voted for
     
     Returns:
-        Updated game state
+        Partial state update (apply with apply_state_update)
     """
-    new_votes = state["votes"].copy()
-    new_votes[player_id] = voted_for
-    
-    new_state = state.copy()
-    new_state["votes"] = new_votes
-    
-    return new_state
+    return {"votes": {player_id: voted_for}}
 
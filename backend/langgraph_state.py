@@ -1,11 +1,24 @@
 """
 LangGraph State Schema for the Human Hunter game.
 Defines the complete game state structure used by the StateGraph.
+
+Player IDs are interned with sys.intern when created, so the many dict
+lookups keyed by them (votes, personalities, counts) compare by identity.
+
+GameState is a TypedDict on purpose: LangGraph passes it through without
+pydantic validation. Do not mirror it with a BaseModel; if one is ever needed
+at an API boundary, build it with model_construct rather than validating.
 """
 
-from typing import TypedDict, List, Dict, Optional, Literal, Annotated
+import random
+import sys
+import time
+from functools import lru_cache
+from types import MappingProxyType
+from typing import TypedDict, List, Dict, Mapping, Optional, Literal, Annotated, Set, Tuple
 from enum import Enum
-import operator
+
+from .config import GAME_TOPICS, AI_PERSONALITIES
 
 
 class Phase(str, Enum):
@@ -29,6 +42,54 @@ class ChatMessage(TypedDict):
     sender: str
     message: str
     timestamp: float
+    id: int  # Position in chat_history, assigned when the message is appended
+
+
+def append_in_place(current: List, update: List) -> List:
+    """
+    Reducer for append-only lists: extend the current list instead of building
+    a concatenated copy on every merge.
+    """
+    current.extend(update)
+    return current
+
+
+def merge_votes(current: Dict[str, str], update: Dict[str, str]) -> Dict[str, str]:
+    """
+    Reducer for votes: merge new voter -> target entries into the current votes.
+    An empty update clears all votes (used when a voting round starts).
+    """
+    if not update:
+        return {}
+    return {**current, **update}
+
+
+def add_counts(current: Dict[str, int], update: Dict[str, int]) -> Dict[str, int]:
+    """
+    Reducer for per-key counters: add the update's increments to the current counts.
+    """
+    merged = dict(current)
+    for key, increment in update.items():
+        merged[key] = merged.get(key, 0) + increment
+    return merged
+
+
+def topic_key(topic: str) -> str:
+    """
+    Lower-cased text of a topic up to its first "?", used to check whether
+    recent messages still mention the topic.
+    """
+    return topic.split("?", 1)[0].lower()
+
+
+def patch_players(current: List[PlayerInfo], update) -> List[PlayerInfo]:
+    """
+    Reducer for players: a list replaces the roster, while a dict of
+    {player_id: {field: value}} patches only the listed players.
+    """
+    if isinstance(update, list):
+        return update
+    return [{**p, **update[p["id"]]} if p["id"] in update else p for p in current]
 
 
 class GameState(TypedDict):
@@ -36,8 +97,8 @@ class GameState(TypedDict):
     Complete game state for LangGraph.
     
     This state is passed through all nodes in the graph and can be updated
-    by any node. Use Annotated with operator.add for lists to append rather
-    than replace.
+    by any node. Append-only lists use the append_in_place reducer rather
+    than being replaced; nodes return only the keys (and new entries) they change.
     """
     # Game metadata
     room_code: str
@@ -46,24 +107,25 @@ class GameState(TypedDict):
     num_ai_players: int
     
     # Players
-    players: List[PlayerInfo]
+    players: Annotated[List[PlayerInfo], patch_players]  # list replaces, {id: fields} patches
     
     # Chat and communication
-    chat_history: Annotated[List[ChatMessage], operator.add]
+    chat_history: Annotated[List[ChatMessage], append_in_place]
+    sender_counts: Annotated[Dict[str, int], add_counts]  # sender_id -> messages sent so far
     
     # Current round topic
     topic: str
+    topic_key: str  # topic_key(topic), computed whenever the topic changes
     
     # Voting
-    votes: Dict[str, str]  # voter_id -> voted_for_id
+    votes: Annotated[Dict[str, str], merge_votes]  # voter_id -> voted_for_id
     
     # AI-specific data
-    ai_personalities: Dict[str, str]  # ai_id -> personality
-    pseudonym_map: Dict[str, str]  # {real_id: pseudo_label} shared across all agents
-    human_external_name: str  # How AIs refer to the human (e.g., "Player 5")
+    ai_personalities: Mapping[str, str]  # ai_id -> personality (read-only)
+    pseudonym_map: Mapping[str, str]  # {real_id: pseudo_label} shared across all agents (read-only)
     
     # Timing
-    last_message_time: float
+    last_message_time: Annotated[float, max]  # time.monotonic(); parallel AI branches keep the latest
     round_start_time: float
     
     # Game outcome
@@ -71,11 +133,62 @@ class GameState(TypedDict):
     eliminated_player: Optional[str]
     
     # Pending actions (for async coordination)
-    pending_ai_messages: List[str]  # List of AI IDs that need to send messages
+    pending_ai_messages: Set[str]  # AI IDs that need to send messages
+    prepared_ai_messages: Dict[str, str]  # ai_id -> message written together with its respond decision
     pending_ai_votes: List[str]  # List of AI IDs that need to vote
     
     # WebSocket broadcast queue (messages to send to frontend)
-    broadcast_queue: Annotated[List[Dict], operator.add]
+    broadcast_queue: Annotated[List[Dict], append_in_place]
+
+
+def apply_state_update(state: GameState, update: Dict) -> GameState:
+    """
+    Apply a partial update to a live state in place, following the same
+    reducers as the graph (append for chat/broadcast lists, merge for votes,
+    add for sender counts, per-player patches for players).
+    
+    Args:
+        state: Game state to update
+        update: Partial state returned by a node or helper
+    
+    Returns:
+        The same state object, updated
+    """
+    for key, value in update.items():
+        if key == "chat_history":
+            history = state.setdefault(key, [])
+            for msg in value:
+                msg["id"] = len(history)
+                history.append(msg)
+        elif key == "broadcast_queue":
+            state.setdefault(key, []).extend(value)
+        elif key == "sender_counts":
+            counts = state.setdefault("sender_counts", {})
+            for sender, increment in value.items():
+                counts[sender] = counts.get(sender, 0) + increment
+        elif key == "players" and isinstance(value, dict):
+            for p in state["players"]:
+                if p["id"] in value:
+                    p.update(value[p["id"]])
+        elif key == "votes":
+            if value:
+                state.setdefault("votes", {}).update(value)
+            else:
+                state["votes"] = {}
+        else:
+            state[key] = value
+    return state
+
+
+@lru_cache(maxsize=16)
+def _id_templates(num_players: int) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Default AI names and pseudonym labels for a given player count, built once
+    per count and shared (read-only) by every room of that size.
+    """
+    default_names = tuple(sys.intern(f"AI_{i}") for i in range(1, num_players + 1))
+    pseudos = tuple(sys.intern(f"P{i}") for i in range(1, num_players + 1))
+    return default_names, pseudos
 
 
 def create_initial_state(room_code: str, num_ai_players: int, ai_player_ids: list = None) -> GameState:
@@ -90,43 +203,37 @@ def create_initial_state(room_code: str, num_ai_players: int, ai_player_ids: lis
     Returns:
         Initial GameState ready for graph execution
     """
-    import random
-    import time
-    from .config import GAME_TOPICS, AI_PERSONALITIES
-    
-    # Create AI player names - use provided IDs or default sequential
+    # Create AI player names - use provided IDs or default sequential, in random order
     if ai_player_ids:
-        ai_names = ai_player_ids
+        ai_names = [sys.intern(name) for name in random.sample(ai_player_ids, len(ai_player_ids))]
     else:
-        ai_names = [f"AI_{i}" for i in range(1, num_ai_players + 1)]
+        default_names, _ = _id_templates(num_ai_players)
+        ai_names = random.sample(default_names, num_ai_players)
     
-    random.shuffle(ai_names)
+    # Distinct personalities while there are enough to go around
+    if len(ai_names) <= len(AI_PERSONALITIES):
+        personalities = random.sample(AI_PERSONALITIES, len(ai_names))
+    else:
+        personalities = random.choices(AI_PERSONALITIES, k=len(ai_names))
     
-    # Create player list with AIs only at initialization; humans join later via API
+    # Create player list with AIs only at initialization; humans join later via API,
+    # assigning personalities to AIs in the same pass
     players: List[PlayerInfo] = []
-    for name in ai_names:
+    ai_personalities = {}
+    for name, personality in zip(ai_names, personalities):
         players.append({
             "id": name,
             "role": "ai",
             "eliminated": False,
-            "personality": random.choice(AI_PERSONALITIES)
+            "personality": personality
         })
-    
-    # Assign personalities to AIs
-    ai_personalities = {
-        p["id"]: p["personality"] 
-        for p in players 
-        if p["role"] == "ai"
-    }
+        ai_personalities[name] = personality
     
     # Create ONE shared pseudonym map for all agents (not used by prompts now)
-    all_player_ids = [p["id"] for p in players]
-    pseudos = [f"P{i+1}" for i in range(len(all_player_ids))]
-    random.shuffle(pseudos)
-    pseudonym_map = dict(zip(all_player_ids, pseudos))
+    _, pseudos = _id_templates(len(ai_names))
+    pseudonym_map = dict(zip(ai_names, random.sample(pseudos, len(pseudos))))
     
-    # No single human external name in multi-human mode; keep empty string for compatibility
-    human_external_name = ""
+    topic = random.choice(GAME_TOPICS)
     
     return GameState(
         room_code=room_code,
@@ -135,16 +242,19 @@ def create_initial_state(room_code: str, num_ai_players: int, ai_player_ids: lis
         num_ai_players=num_ai_players,
         players=players,
         chat_history=[],
-        topic=random.choice(GAME_TOPICS),
+        sender_counts={},
+        topic=topic,
+        topic_key=topic_key(topic),
         votes={},
-        ai_personalities=ai_personalities,
-        pseudonym_map=pseudonym_map,
-        human_external_name=human_external_name,
-        last_message_time=time.time(),
+        # Fixed for the whole game, so exposed as read-only views
+        ai_personalities=MappingProxyType(ai_personalities),
+        pseudonym_map=MappingProxyType(pseudonym_map),
+        last_message_time=time.monotonic(),
         round_start_time=time.time(),
         winner=None,
         eliminated_player=None,
-        pending_ai_messages=[],  # Start empty; active decision-making will populate this
+        pending_ai_messages=set(),  # Start empty; active decision-making will populate this
+        prepared_ai_messages={},
         pending_ai_votes=[],
         broadcast_queue=[]
     )
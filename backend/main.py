@@ -4,14 +4,24 @@ Maintains WebSocket compatibility with frontend while using graph-based backend.
 """
 
 import asyncio
+import base64
+import hashlib
+import itertools
 import random
+import secrets
+import sys
+import threading
 import time
-from typing import Dict
-from concurrent.futures import ThreadPoolExecutor
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from collections import Counter, deque
+from typing import Deque, Dict
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 import os
 from dotenv import load_dotenv
+import logging
+import orjson
+from sortedcontainers import SortedList
 
 from .langgraph_game import (
     game_graph, 
@@ -19,15 +29,18 @@ from .langgraph_game import (
     process_human_message,
     process_human_vote
 )
-from .langgraph_state import GameState, Phase
-from .config import NUM_AI_PLAYERS, DISCUSSION_TIME, VOTING_TIME
-import json
+from .langgraph_state import GameState, Phase, apply_state_update
+from .config import NUM_AI_PLAYERS, DISCUSSION_TIME, VOTING_TIME, DECISION_MIN_INTERVAL, TYPING_FLUSH_DELAY, WS_SEND_QUEUE_SIZE
 import os
 import time as _time
 
 load_dotenv()
 
-app = FastAPI()
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"), format="%(message)s")
+logger = logging.getLogger(__name__)
+
+# Endpoint dicts are encoded with orjson instead of the stdlib json module
+app = FastAPI(default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -37,147 +50,349 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Thread pool for running blocking AI operations without blocking the event loop
-executor = ThreadPoolExecutor(max_workers=10)
+# Set once the app has started, so a launcher running the server in another
+# thread (deploy.py) can wait for it without polling /health
+ready_event = threading.Event()
+
+
+@app.on_event("startup")
+async def _mark_ready():
+    ready_event.set()
 
 # Room management
 rooms: Dict[str, Dict] = {}
 # Structure: {
 #   room_code: {
 #     'state': GameState,
-#     'connections': {player_id: WebSocket},
-#     'tasks': [],
+#     'connections': {player_id: Subscriber},
+#     'tasks': set(),            # Background tasks, cancelled when the room is deleted
 #     'ai_processing_agents': set(),
-#     'ai_lock': asyncio.Lock(),
 #     'room_name': str,          # Display name for the room
 #     'max_humans': int,          # Maximum human players (1-4)
 #     'total_players': int,       # Total players including AI (default 5)
 #     'room_status': str,         # 'waiting' | 'in_progress' | 'completed'
-#     'created_at': float,        # Timestamp
+#     'created_at': float,        # Wall-clock timestamp, for display
+#     'sort_key': int,            # time.monotonic_ns() at creation, for ordering
 #     'creator_id': str,          # Creator's player ID
-#     'current_humans': List[str] # List of joined human player IDs
+#     'current_humans': List[str] # List of joined human player IDs (join order)
+#     'humans_set': Set[str]      # Same IDs, for O(1) membership checks
 #   }
 # }
 
-# Room locks for preventing race conditions in AI processing
-room_locks: Dict[str, asyncio.Lock] = {}
+# Striped locks for preventing race conditions in AI processing: a fixed pool
+# shared by hash of room code, so rooms never create or delete a lock
+ROOM_LOCK_STRIPES = 16
+_room_locks = tuple(asyncio.Lock() for _ in range(ROOM_LOCK_STRIPES))
+
+
+def room_lock(room_code: str) -> asyncio.Lock:
+    """Return the lock guarding AI processing for a room."""
+    return _room_locks[hash(room_code) % ROOM_LOCK_STRIPES]
+
+# Rooms in 'waiting' status as (-sort_key, room_code), newest first,
+# so the lobby list is a slice instead of a scan and sort over all rooms
+waiting_rooms: SortedList = SortedList()
+
+
+def list_waiting_room(room_code: str):
+    """Add a room to the lobby index."""
+    waiting_rooms.add((-rooms[room_code]['sort_key'], room_code))
+
+
+def unlist_waiting_room(room_code: str):
+    """Remove a room from the lobby index (a no-op if it isn't listed)."""
+    room = rooms.get(room_code)
+    if room is not None:
+        waiting_rooms.discard((-room['sort_key'], room_code))
+
+
+def get_players_view(room: dict) -> list:
+    """
+    Return the player list served by the polled state endpoint, building it
+    only when the roster or votes changed since the last poll.
+    """
+    view = room.get('players_view')
+    if view is None:
+        state = room['state']
+        votes = state.get('votes', {})
+        view = room['players_view'] = [
+            {
+                "id": p['id'],
+                "role": p['role'],
+                "eliminated": p['eliminated'],
+                "voted": p['id'] in votes
+            }
+            for p in state['players']
+        ]
+    return view
+
+
+def invalidate_players_view(room_code: str, roster: bool = False):
+    """
+    Drop a room's cached players view after a join, leave or vote.
+    
+    Args:
+        room_code: Room identifier
+        roster: True when players were added or removed, which also drops
+            the cached active-player count
+    """
+    room = rooms.get(room_code)
+    if room is not None:
+        room.pop('players_view', None)
+        if roster:
+            room.pop('active_count', None)
+
+
+def active_player_count(room_code: str) -> int:
+    """
+    Number of players still in the game, counted once per roster change
+    rather than on every vote.
+    """
+    room = rooms[room_code]
+    count = room.get('active_count')
+    if count is None:
+        count = room['active_count'] = sum(
+            1 for p in room['state']['players'] if not p['eliminated']
+        )
+    return count
+
+
+# Room codes come from a counter scrambled by a fixed bijection on 30 bits
+# (odd multiplier, then a per-process random XOR), so codes never repeat
+# within a process yet consecutive rooms don't get guessable neighbours
+_ROOM_CODE_MASK = (1 << 30) - 1
+_ROOM_CODE_MULT = 0x2545F491  # odd, so multiplication mod 2**30 is invertible
+_ROOM_CODE_KEY = secrets.randbits(30)
+_room_counter = itertools.count(int(time.time()))
 
 
 def generate_room_code() -> str:
     """
     Generate a unique 6-character alphanumeric room code.
-    Format: AB12CD (uppercase letters and numbers)
+    Format: AB12CD (uppercase letters and digits 2-7, base32 of a 30-bit ID)
     
     Returns:
         Unique room code
     """
-    import string
-    chars = string.ascii_uppercase + string.digits
     while True:
-        code = ''.join(random.choice(chars) for _ in range(6))
+        n = ((next(_room_counter) * _ROOM_CODE_MULT) & _ROOM_CODE_MASK) ^ _ROOM_CODE_KEY
+        # 5 bytes -> 8 base32 chars; the last 6 carry the low 30 bits
+        code = base64.b32encode(n.to_bytes(5, 'big')).decode()[-6:]
+        # Only a client-chosen legacy code can already hold this slot
         if code not in rooms:
             return code
 
 
+async def ws_send(websocket: WebSocket, message: dict):
+    """Send one message to a single client as an orjson-encoded binary frame."""
+    await websocket.send_bytes(orjson.dumps(message))
+
+
+class Subscriber:
+    """
+    Outgoing side of one WebSocket connection.
+    Frames are queued and written by a per-connection drain task, so a slow
+    client never holds up a broadcast; whatever queued up during a write is
+    sent next as a single batch frame. The queue is bounded: a client that
+    falls WS_SEND_QUEUE_SIZE frames behind is marked failed and its socket is
+    closed (code 1013), so it reconnects and resyncs from last_seen_id rather
+    than silently missing frames.
+    """
+    
+    __slots__ = ('websocket', 'queue', 'failed', '_wakeup', '_task', '_closing')
+    
+    def __init__(self, websocket: WebSocket):
+        self.websocket = websocket
+        self.queue: Deque[bytes] = deque()
+        self.failed = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._drain())
+        self._closing = None
+    
+    def enqueue(self, payload: bytes):
+        """Queue an orjson-serialized frame for delivery (never blocks)."""
+        if self.failed:
+            return
+        if len(self.queue) >= WS_SEND_QUEUE_SIZE:
+            logger.warning("⚠️ Client fell %d frames behind, closing it to resync", len(self.queue))
+            self.failed = True
+            self.queue.clear()
+            self._task.cancel()
+            self._closing = asyncio.create_task(self._close_socket())
+            return
+        self.queue.append(payload)
+        self._wakeup.set()
+    
+    async def _close_socket(self):
+        try:
+            await self.websocket.close(code=1013)  # Try again later
+        except Exception:
+            pass
+    
+    async def _drain(self):
+        try:
+            while True:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                # Frames that piled up since the last write go out as one
+                # batch frame, spliced from their already-serialized bytes.
+                # Frames are binary (UTF-8 JSON), skipping a str round-trip
+                while self.queue:
+                    if len(self.queue) == 1:
+                        await self.websocket.send_bytes(self.queue.popleft())
+                        continue
+                    frames = list(self.queue)
+                    self.queue.clear()
+                    await self.websocket.send_bytes(
+                        b'{"type":"batch","messages":[' + b",".join(frames) + b"]}"
+                    )
+        except Exception as e:
+            self.failed = True
+            logger.error("❌ Error sending to client: %s: %s", type(e).__name__, e)
+    
+    def close(self):
+        """Stop delivering frames to this connection."""
+        self._task.cancel()
+
+
 async def broadcast_to_room(room_code: str, message: dict, exclude_player: str = None):
     """
     Broadcast a message to all connections in a room.
-    Automatically removes stale connections that fail.
+    The message is serialized once and queued on each connection's Subscriber;
+    connections whose delivery has failed are removed.
     
     Args:
         room_code: Room identifier
         message: Message dictionary to broadcast
         exclude_player: Optional player_id to exclude from broadcast (e.g., message sender)
     """
-    if room_code not in rooms:
+    room = rooms.get(room_code)
+    if room is None:
         return
     
-    connections = rooms[room_code]['connections']
-    print(f"📡 Broadcasting to {len(connections)} clients: {message.get('type', 'unknown')}")
+    connections = room['connections']
+    logger.debug("📡 Broadcasting to %d clients: %s", len(connections), message.get('type', 'unknown'))
+    
+    payload = orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS)
     
     # Track failed connections to remove after iteration
     failed_connections = []
-    
-    for player_id, websocket in connections.items():
-        if exclude_player and player_id == exclude_player:
-            print(f"⏭️  Skipping broadcast to sender: {player_id}")
-            continue
-        try:
-            await websocket.send_json(message)
-        except Exception as e:
-            print(f"❌ Error broadcasting to {player_id}: {type(e).__name__}: {str(e)}")
+    for player_id, subscriber in connections.items():
+        if subscriber.failed:
             failed_connections.append(player_id)
+        elif exclude_player and player_id == exclude_player:
+            logger.debug("⏭️  Skipping broadcast to sender: %s", player_id)
+        else:
+            subscriber.enqueue(payload)
     
     # Clean up stale connections
     for player_id in failed_connections:
-        print(f"🗑️ Removing stale connection: {player_id}")
-        rooms[room_code]['connections'].pop(player_id, None)
+        logger.info("🗑️ Removing stale connection: %s", player_id)
+        connections.pop(player_id).close()
+
+
+async def broadcast_batch(room_code: str, messages: list, exclude_player: str = None):
+    """
+    Broadcast several messages to a room as a single frame.
+    
+    More than one message is wrapped in a {"type": "batch", "messages": [...]}
+    envelope that the client unpacks in order; a single message is sent as-is.
+    
+    Args:
+        room_code: Room identifier
+        messages: Message dictionaries to broadcast, in order
+        exclude_player: Optional player_id to exclude from broadcast
+    """
+    messages = list(messages)
+    if not messages:
+        return
+    if len(messages) == 1:
+        await broadcast_to_room(room_code, messages[0], exclude_player)
+    else:
+        await broadcast_to_room(room_code, {"type": "batch", "messages": messages}, exclude_player)
 
 
 async def process_broadcast_queue(room_code: str, state: GameState):
     """
-    Process and send all messages in the broadcast queue.
+    Send and remove all messages in the broadcast queue as one frame.
     
     Args:
         room_code: Room identifier
         state: Current game state with broadcast_queue
     """
-    for message in state.get("broadcast_queue", []):
-        await broadcast_to_room(room_code, message)
+    queue = state.get("broadcast_queue")
+    if queue:
+        messages = list(queue)
+        queue.clear()
+        await broadcast_batch(room_code, messages)
 
 
-async def proactive_agent_engagement(room_code: str):
+def reset_quiet_timer(room_code: str):
     """
-    Periodically check if agents should proactively engage in conversation.
-    This prevents long silences and encourages natural conversation flow.
+    (Re)arm the room's quiet timer. Called whenever a message is added: if the
+    chat then stays silent for 10-15 seconds, agents are asked whether to
+    speak up. This prevents long silences without polling every room.
     
     Args:
         room_code: Room identifier
     """
-    while room_code in rooms:
-        state = rooms[room_code]['state']
-        
-        # Only during discussion phase
-        if state['phase'] != Phase.DISCUSSION:
-            break
-        
-        # Wait for a period before checking (stagger checks to avoid conflicts)
-        await asyncio.sleep(random.uniform(8, 15))
-        
-        if room_code not in rooms:
-            break
-        
-        state = rooms[room_code]['state']
-        
-        # Check if still in discussion
-        if state['phase'] != Phase.DISCUSSION:
-            break
-        
-        # Check if conversation has been quiet (no messages in last 10 seconds)
-        last_message_time = state.get('last_message_time', 0)
-        time_since_last = time.time() - last_message_time
-        
-        if time_since_last > 10:
-            print(f"💤 Conversation quiet for {time_since_last:.1f}s, triggering proactive engagement")
-            asyncio.create_task(trigger_agent_decisions(room_code))
+    room = rooms.get(room_code)
+    if room is None:
+        return
+    cancel_quiet_timer(room_code)
+    if room['state']['phase'] != Phase.DISCUSSION:
+        return
+    room['quiet_timer'] = asyncio.get_running_loop().call_later(
+        random.uniform(10, 15), _on_quiet, room_code
+    )
+
+
+def cancel_quiet_timer(room_code: str):
+    """
+    Stop the room's quiet timer, if one is armed.
+    
+    Args:
+        room_code: Room identifier
+    """
+    room = rooms.get(room_code)
+    handle = room.pop('quiet_timer', None) if room else None
+    if handle is not None:
+        handle.cancel()
+
+
+def _on_quiet(room_code: str):
+    """Quiet timer callback: trigger agent decisions and re-arm for further silence."""
+    room = rooms.get(room_code)
+    if room is None:
+        return
+    room.pop('quiet_timer', None)
+    state = room['state']
+    if state['phase'] != Phase.DISCUSSION:
+        return
+    time_since_last = time.monotonic() - state.get('last_message_time', 0)
+    logger.info("💤 Conversation quiet for %.1fs, triggering proactive engagement", time_since_last)
+    request_agent_decisions(room_code)
+    reset_quiet_timer(room_code)
 
 
 async def run_discussion_phase(room_code: str):
     """
     Run the discussion phase for a room.
     Manages timer and triggers voting phase.
-    Also enables proactive agent engagement.
+    Opens the phase with a round of agent decisions (AIs individually decide
+    whether to start the conversation) and arms the quiet timer for
+    proactive agent engagement.
     
     Args:
         room_code: Room identifier
     """
-    # Start proactive engagement task
-    engagement_task = asyncio.create_task(proactive_agent_engagement(room_code))
+    request_agent_decisions(room_code)
+    reset_quiet_timer(room_code)
     
     await asyncio.sleep(DISCUSSION_TIME)
     
-    # Cancel proactive engagement when discussion ends
-    engagement_task.cancel()
+    # Stop proactive engagement when discussion ends
+    cancel_quiet_timer(room_code)
     
     if room_code not in rooms:
         return
@@ -190,25 +405,20 @@ async def run_discussion_phase(room_code: str):
         state['phase'] = Phase.VOTING
         
         # CRITICAL: Clear ALL pending operations to prevent late messages
-        state['pending_ai_messages'] = []
+        state['pending_ai_messages'] = set()
+        state['prepared_ai_messages'] = {}
         
         # Stop all typing indicators for any AI that might be typing
         ai_players = [p['id'] for p in state['players'] if p['role'] == 'ai']
         for ai_id in ai_players:
-            await broadcast_to_room(room_code, {
-                "type": "typing",
-                "player": ai_id,
-                "status": "stop"
-            })
+            await set_ai_typing(room_code, ai_id, False)
         
         state['pending_ai_votes'] = [
             p['id'] for p in state['players']
             if p['role'] == 'ai' and not p['eliminated']
         ]
         state['votes'] = {}
-        
-        # Save state BEFORE broadcasting to ensure checks see VOTING phase
-        rooms[room_code]['state'] = state
+        invalidate_players_view(room_code)
         
         # Broadcast phase change
         await broadcast_to_room(room_code, {
@@ -217,11 +427,11 @@ async def run_discussion_phase(room_code: str):
             "message": "Discussion ended. Time to vote."
         })
         
-        print(f"✅ Phase transition complete: DISCUSSION → VOTING in room {room_code}")
+        logger.info("✅ Phase transition complete: DISCUSSION → VOTING in room %s", room_code)
         
         # Start voting phase
-        asyncio.create_task(run_voting_phase(room_code))
-        asyncio.create_task(process_ai_votes(room_code))
+        spawn_room_task(room_code, run_voting_phase(room_code))
+        spawn_room_task(room_code, process_ai_votes(room_code))
 
 
 async def run_voting_phase(room_code: str):
@@ -256,36 +466,46 @@ async def process_ai_votes(room_code: str):
         return
     
     state = rooms[room_code]['state']
+    if not state.get('pending_ai_votes') or state['phase'] != Phase.VOTING:
+        return
     
-    while state.get('pending_ai_votes') and state['phase'] == Phase.VOTING:
-        # Get next AI voter
-        ai_id = state['pending_ai_votes'][0]
-        
-        # Run single AI vote node in thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            executor,
-            lambda: game_graph.ai_vote_agent_node(state, ai_id=ai_id)
-        )
-        
-        # Update state - merge votes instead of replacing to preserve human votes
-        if 'votes' in result:
-            print(f"🤖 AI {ai_id} voting. Before: {state['votes']}")
-            state['votes'].update(result['votes'])
-            print(f"🤖 AI {ai_id} voted. After: {state['votes']}")
-        state['pending_ai_votes'] = result.get('pending_ai_votes', [])
-        rooms[room_code]['state'] = state
-        
-        # Broadcast vote
-        if 'broadcast_queue' in result:
-            for msg in result['broadcast_queue']:
-                await broadcast_to_room(room_code, msg)
-        
-        # Check if voting complete
-        active_players = [p['id'] for p in state['players'] if not p['eliminated']]
-        if len(state['votes']) >= len(active_players):
-            await complete_voting(room_code)
-            break
+    # Run every pending AI vote node at once (async LLM calls, each with its own
+    # realism delay) and apply each vote as soon as it arrives
+    vote_tasks = [
+        asyncio.create_task(game_graph.ai_vote_agent_node(state, ai_id=ai_id))
+        for ai_id in list(state['pending_ai_votes'])
+    ]
+    try:
+        for next_result in asyncio.as_completed(vote_tasks):
+            try:
+                result = await next_result
+            except Exception as e:
+                logger.warning("⚠️ Error in AI vote: %s", e)
+                continue
+            if state['phase'] != Phase.VOTING:
+                break
+            
+            # Update state - merge votes instead of replacing to preserve human votes
+            if 'votes' in result:
+                logger.debug("🤖 AI voting. Before: %s", state['votes'])
+                state['votes'].update(result['votes'])
+                invalidate_players_view(room_code)
+                logger.debug("🤖 AI voted. After: %s", state['votes'])
+                state['pending_ai_votes'] = [
+                    aid for aid in state['pending_ai_votes'] if aid not in result['votes']
+                ]
+            
+            # Broadcast vote
+            if 'broadcast_queue' in result:
+                await broadcast_batch(room_code, result['broadcast_queue'])
+            
+            # Check if voting complete
+            if len(state['votes']) >= active_player_count(room_code):
+                await complete_voting(room_code)
+                break
+    finally:
+        for task in vote_tasks:
+            task.cancel()
 
 
 async def complete_voting(room_code: str):
@@ -303,19 +523,16 @@ async def complete_voting(room_code: str):
     if state['phase'] != Phase.VOTING:
         return
     
-    print(f"🏁 Completing voting for room {room_code}")
-    print(f"📊 Final votes before processing: {state.get('votes', {})}")
+    logger.info("🏁 Completing voting for room %s", room_code)
+    logger.debug("📊 Final votes before processing: %s", state.get('votes', {}))
     
     # Determine suspect (player with most votes) and winner directly; no elimination
-    vote_counts: Dict[str, int] = {}
-    for _, target in state.get('votes', {}).items():
-        if target is None:
-            continue
-        vote_counts[target] = vote_counts.get(target, 0) + 1
+    vote_counts = Counter(t for t in state.get('votes', {}).values() if t is not None)
     suspect = None
     if vote_counts:
-        max_votes = max(vote_counts.values())
-        candidates = [pid for pid, cnt in vote_counts.items() if cnt == max_votes]
+        ranked = vote_counts.most_common()
+        max_votes = ranked[0][1]
+        candidates = [pid for pid, cnt in ranked if cnt == max_votes]
         suspect = random.choice(candidates) if len(candidates) > 1 else candidates[0]
     # Default fallback if no votes: choose a random AI
     if not suspect:
@@ -331,7 +548,6 @@ async def complete_voting(room_code: str):
     state['suspect_role'] = suspect_role
     state['winner'] = 'human' if suspect_role == 'ai' else 'ai'
     state['phase'] = Phase.GAME_OVER
-    rooms[room_code]['state'] = state
     
     # Broadcast voting result
     await broadcast_to_room(room_code, {
@@ -345,14 +561,35 @@ async def complete_voting(room_code: str):
     result = game_graph.game_over_node(state)
     state.update(result)
     if 'broadcast_queue' in result:
-        for msg in result['broadcast_queue']:
-            await broadcast_to_room(room_code, msg)
-    rooms[room_code]['state'] = state
+        await broadcast_batch(room_code, result['broadcast_queue'])
     
     # Save stats at end
     await save_session_stats(room_code, state)
 
 
+async def set_ai_typing(room_code: str, ai_id: str, typing: bool):
+    """
+    Show or hide an AI's typing indicator, broadcasting only when it changes.
+    
+    Args:
+        room_code: Room identifier
+        ai_id: AI player ID
+        typing: True to show the indicator, False to hide it
+    """
+    room = rooms.get(room_code)
+    if room is None:
+        return
+    typing_state = room.setdefault('typing_state', {})
+    if typing_state.get(ai_id, False) == typing:
+        return
+    typing_state[ai_id] = typing
+    await broadcast_to_room(room_code, {
+        "type": "typing",
+        "player": ai_id,
+        "status": "start" if typing else "stop"
+    })
+
+
 async def process_single_ai_message(room_code: str, ai_id: str):
     """
     Process a single AI agent's message asynchronously.
@@ -363,23 +600,35 @@ async def process_single_ai_message(room_code: str, ai_id: str):
         room_code: Room identifier
         ai_id: AI agent identifier
     """
-    if room_code not in rooms:
+    room = rooms.get(room_code)
+    if room is None:
         return
     
-    print(f"🤖 Processing message for AI {ai_id} in room {room_code}")
+    logger.info("🤖 Processing message for AI %s in room %s", ai_id, room_code)
     
     try:
-        state = rooms[room_code]['state']
+        state = room['state']
         
         # Check if this AI is still in pending messages
-        if ai_id not in state.get('pending_ai_messages', []):
+        if ai_id not in state.get('pending_ai_messages', ()):
             return
         
-        # Run AI chat node for this specific agent in thread pool to avoid blocking event loop
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            executor, 
-            lambda: game_graph.ai_chat_agent_node(state, ai_id=ai_id)
+        typing_started = False
+        
+        async def show_typing_on_first_tokens(_text: str):
+            # Streamed text is not pushed to clients (it would give the AI away);
+            # the first tokens just bring the typing indicator up early.
+            nonlocal typing_started
+            if typing_started:
+                return
+            if room['state']['phase'] != Phase.DISCUSSION:
+                return
+            typing_started = True
+            await set_ai_typing(room_code, ai_id, True)
+        
+        # Run AI chat node for this specific agent (async LLM call, does not block the event loop)
+        result = await game_graph.ai_chat_agent_node(
+            state, ai_id=ai_id, on_partial=show_typing_on_first_tokens
         )
         
         if not result:
@@ -387,13 +636,11 @@ async def process_single_ai_message(room_code: str, ai_id: str):
         
         # DEFENSE LAYER 1: Check phase BEFORE doing anything
         # AI generation can take seconds, phase might have changed
-        current_state = rooms[room_code]['state']
+        current_state = room['state']
         if current_state['phase'] != Phase.DISCUSSION:
-            print(f"🚫 AI {ai_id} message blocked - phase is {current_state['phase'].value}, not DISCUSSION")
+            logger.info("🚫 AI %s message blocked - phase is %s, not DISCUSSION", ai_id, current_state['phase'].value)
             # Remove from pending without saving message
-            if 'pending_ai_messages' in current_state:
-                current_state['pending_ai_messages'] = [p for p in current_state['pending_ai_messages'] if p != ai_id]
-                rooms[room_code]['state'] = current_state
+            current_state.get('pending_ai_messages', set()).discard(ai_id)
             return
         
         # Extract message details before updating state
@@ -405,86 +652,164 @@ async def process_single_ai_message(room_code: str, ai_id: str):
         typing_delay = result.get('typing_delay', 1.5)
         
         # DEFENSE LAYER 2: Check phase before typing indicator
-        current_state = rooms[room_code]['state']
+        current_state = room['state']
         if current_state['phase'] != Phase.DISCUSSION:
-            print(f"🚫 AI {ai_id} typing blocked - phase changed to {current_state['phase'].value}")
+            logger.info("🚫 AI %s typing blocked - phase changed to %s", ai_id, current_state['phase'].value)
             return
             
-        # Broadcast typing start
-        await broadcast_to_room(room_code, {
-            "type": "typing",
-            "player": ai_sender,
-            "status": "start"
-        })
+        # Broadcast typing start (a no-op if streaming already did)
+        await set_ai_typing(room_code, ai_sender, True)
         
         # Wait for typing delay
         await asyncio.sleep(typing_delay)
         
         # DEFENSE LAYER 3: Check phase AFTER typing delay, BEFORE saving/broadcasting
-        current_state = rooms[room_code]['state']
+        current_state = room['state']
         if current_state['phase'] != Phase.DISCUSSION:
-            print(f"🚫 AI {ai_id} message blocked after typing - phase changed to {current_state['phase'].value}")
+            logger.info("🚫 AI %s message blocked after typing - phase changed to %s", ai_id, current_state['phase'].value)
             # Cancel typing indicator
-            await broadcast_to_room(room_code, {
-                "type": "typing",
-                "player": ai_sender,
-                "status": "stop"
-            })
+            await set_ai_typing(room_code, ai_sender, False)
             return
         
         # NOW it's safe to update state and broadcast message
-        # Update chat history ONLY if still in discussion
-        if 'chat_history' in result:
-            current_state['chat_history'] = current_state['chat_history'] + result['chat_history']
-        if 'last_message_time' in result:
-            current_state['last_message_time'] = result['last_message_time']
-        if 'pending_ai_messages' in result:
-            current_state['pending_ai_messages'] = result['pending_ai_messages']
-        
-        rooms[room_code]['state'] = current_state
+        # Update chat history (and sender counts) ONLY if still in discussion
+        apply_state_update(current_state, {
+            key: result[key]
+            for key in ('chat_history', 'sender_counts', 'last_message_time')
+            if key in result
+        })
+        current_state.get('pending_ai_messages', set()).discard(ai_id)
+        reset_quiet_timer(room_code)
         
         # Broadcast message and typing stop
         await broadcast_to_room(room_code, {
             "type": "message",
+            "id": result['chat_history'][0]['id'],
             "sender": ai_sender,
             "message": ai_message
         })
-        await broadcast_to_room(room_code, {
-            "type": "typing",
-            "player": ai_sender,
-            "status": "stop"
-        })
+        await set_ai_typing(room_code, ai_sender, False)
         
         # Handle any other broadcasts from result
         if 'broadcast_queue' in result:
-            for msg in result['broadcast_queue']:
-                await broadcast_to_room(room_code, msg)
+            await broadcast_batch(room_code, result['broadcast_queue'])
         
         # After AI speaks, give other agents a chance to respond
         # Add small delay to allow message to be processed
         await asyncio.sleep(1.5)
         
         # DEFENSE LAYER 4: Check phase before triggering more AI responses
-        current_state = rooms[room_code]['state']
+        current_state = room['state']
         if current_state['phase'] == Phase.DISCUSSION:
             # Only trigger new responses if still in discussion
-            asyncio.create_task(trigger_agent_decisions(room_code, exclude_agents=[ai_id]))
+            request_agent_decisions(room_code, exclude_agents=[ai_id])
         else:
-            print(f"🚫 Not triggering new AI responses - phase is {current_state['phase'].value}")
+            logger.info("🚫 Not triggering new AI responses - phase is %s", current_state['phase'].value)
                 
     finally:
-        # Remove this AI from processing set
-        if room_code in rooms:
-            processing_agents = rooms[room_code].get('ai_processing_agents', set())
-            processing_agents.discard(ai_id)
-            rooms[room_code]['ai_processing_agents'] = processing_agents
-            print(f"✅ AI {ai_id} completed message in room {room_code}")
+        # Remove this AI from processing set and drop its prepared message (used or stale)
+        room['state'].get('prepared_ai_messages', {}).pop(ai_id, None)
+        room.setdefault('ai_processing_agents', set()).discard(ai_id)
+        logger.info("✅ AI %s completed message in room %s", ai_id, room_code)
+
+
+def request_agent_decisions(room_code: str, exclude_agents: list = None):
+    """
+    Queue a round of agent decisions for the room's worker, starting the
+    worker on first use.
+    
+    Args:
+        room_code: Room identifier
+        exclude_agents: List of agent IDs to exclude from decision-making
+    """
+    room = rooms.get(room_code)
+    if room is None:
+        return
+    work_q = room.get('work_q')
+    if work_q is None:
+        work_q = room['work_q'] = asyncio.Queue()
+        room['worker'] = asyncio.create_task(room_worker(room_code, work_q))
+    work_q.put_nowait(set(exclude_agents or ()))
+
+
+async def room_worker(room_code: str, work_q: asyncio.Queue):
+    """
+    Run queued decision rounds for a room one at a time.
+    Requests that pile up while a round runs are merged into the next round
+    (only agents excluded by every request stay excluded), and rounds start
+    at least DECISION_MIN_INTERVAL seconds apart.
+    
+    Args:
+        room_code: Room identifier
+        work_q: The room's queue of exclude-sets
+    """
+    last_round = float('-inf')
+    while True:
+        excluded = await work_q.get()
+        while not work_q.empty():
+            excluded &= work_q.get_nowait()
+        
+        wait = DECISION_MIN_INTERVAL - (time.monotonic() - last_round)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        last_round = time.monotonic()
+        
+        try:
+            await trigger_agent_decisions(room_code, exclude_agents=list(excluded))
+        except Exception as e:
+            logger.error("❌ Agent decision round failed in room %s: %s", room_code, e)
+
+
+def spawn_room_task(room_code: str, coro) -> asyncio.Task:
+    """
+    Start a background task owned by a room. The room holds a reference until
+    the task finishes (so it can't be garbage-collected mid-flight) and
+    cancels it if the room is deleted first.
+    
+    Args:
+        room_code: Room identifier
+        coro: Coroutine to run
+    
+    Returns:
+        The created task
+    """
+    task = asyncio.create_task(coro)
+    room = rooms.get(room_code)
+    if room is not None:
+        tasks = room['tasks']
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    return task
+
+
+def stop_room_tasks(room_code: str):
+    """
+    Stop a room's quiet timer, decision worker, pending typing flush and
+    background tasks, and drop its cached prompt text (call before deleting the room).
+    
+    Args:
+        room_code: Room identifier
+    """
+    cancel_quiet_timer(room_code)
+    game_graph.forget_room(room_code)
+    room = rooms.get(room_code)
+    if room is None:
+        return
+    for key in ('worker', 'typing_flush'):
+        task = room.pop(key, None)
+        if task is not None:
+            task.cancel()
+    current = asyncio.current_task()
+    for task in list(room['tasks']):
+        if task is not current:
+            task.cancel()
 
 
 async def trigger_agent_decisions(room_code: str, exclude_agents: list = None):
     """
     Trigger all agents to actively decide whether to respond to the current conversation.
     This enables agents to respond to each other and engage proactively.
+    Run by the room worker; other code queues rounds with request_agent_decisions().
     
     Args:
         room_code: Room identifier
@@ -499,20 +824,6 @@ async def trigger_agent_decisions(room_code: str, exclude_agents: list = None):
     if state['phase'] != Phase.DISCUSSION:
         return
     
-    # Check if we're still processing previous decisions (cooldown to prevent loops)
-    if 'last_decision_trigger_time' not in rooms[room_code]:
-        rooms[room_code]['last_decision_trigger_time'] = 0
-    
-    current_time = time.time()
-    time_since_last_trigger = current_time - rooms[room_code]['last_decision_trigger_time']
-    
-    # Cooldown: don't trigger decisions too frequently (minimum 2 seconds between triggers)
-    if time_since_last_trigger < 2.0:
-        print(f"⏸️ Skipping agent decision trigger (cooldown: {time_since_last_trigger:.1f}s < 2.0s)")
-        return
-    
-    rooms[room_code]['last_decision_trigger_time'] = current_time
-    
     # Get all active AIs, excluding specified ones
     active_ais = [
         p["id"] for p in state["players"]
@@ -525,32 +836,31 @@ async def trigger_agent_decisions(room_code: str, exclude_agents: list = None):
     if not active_ais:
         return
     
-    # Run decision-making in thread pool to avoid blocking
-    loop = asyncio.get_event_loop()
-    
-    # Let each AI decide if they should respond
+    # Let all AIs decide concurrently if they should respond (responders also write their message)
+    decisions = await asyncio.gather(
+        *(game_graph._decide_and_generate(state, ai_id) for ai_id in active_ais),
+        return_exceptions=True
+    )
     responding_ais = []
-    for ai_id in active_ais:
-        try:
-            should_respond = await loop.run_in_executor(
-                executor,
-                lambda aid=ai_id: game_graph._should_agent_respond(state, aid)
-            )
-            if should_respond:
-                responding_ais.append(ai_id)
-        except Exception as e:
-            print(f"⚠️ Error in decision for {ai_id}: {e}")
+    for ai_id, decision in zip(active_ais, decisions):
+        if isinstance(decision, Exception):
+            logger.warning("⚠️ Error in decision for %s: %s", ai_id, decision)
+            continue
+        should_respond, prepared_message = decision
+        if should_respond:
+            responding_ais.append(ai_id)
+            if prepared_message:
+                state.setdefault('prepared_ai_messages', {})[ai_id] = prepared_message
     
     # Update pending AI messages
     if responding_ais:
-        state['pending_ai_messages'] = responding_ais
-        rooms[room_code]['state'] = state
-        print(f"🎯 {len(responding_ais)}/{len(active_ais)} agents decided to respond: {responding_ais}")
+        state['pending_ai_messages'] = set(responding_ais)
+        logger.info("🎯 %s/%s agents decided to respond: %s", len(responding_ais), len(active_ais), responding_ais)
         
         # Trigger the responses
-        asyncio.create_task(process_ai_messages(room_code))
+        spawn_room_task(room_code, process_ai_messages(room_code))
     else:
-        print(f"🤐 No agents decided to respond this time")
+        logger.info("🤐 No agents decided to respond this time")
 
 
 async def process_ai_messages(room_code: str):
@@ -565,38 +875,32 @@ async def process_ai_messages(room_code: str):
     if room_code not in rooms:
         return
     
-    # Get or create lock for this room
-    if room_code not in room_locks:
-        room_locks[room_code] = asyncio.Lock()
-    
     # Use lock to prevent concurrent calls from creating duplicate tasks
-    async with room_locks[room_code]:
+    async with room_lock(room_code):
         state = rooms[room_code]['state']
         
         # DEFENSE: Only process AI messages during discussion phase
         if state['phase'] != Phase.DISCUSSION:
-            print(f"🚫 Not processing AI messages - phase is {state['phase'].value}, not DISCUSSION")
+            logger.info("🚫 Not processing AI messages - phase is %s, not DISCUSSION", state['phase'].value)
             return
         
-        pending_ais = state.get('pending_ai_messages', []).copy()
-        processing_agents = rooms[room_code].get('ai_processing_agents', set())
+        pending_ais = state.get('pending_ai_messages') or set()
+        processing_agents = rooms[room_code].setdefault('ai_processing_agents', set())
         
         if not pending_ais:
             return
         
         # Filter out AIs that are already processing
-        ais_to_process = [ai_id for ai_id in pending_ais if ai_id not in processing_agents]
+        ais_to_process = pending_ais - processing_agents
         
         if not ais_to_process:
-            print(f"⏭️  All pending AIs already processing in room {room_code}")
+            logger.debug("⏭️  All pending AIs already processing in room %s", room_code)
             return
         
-        print(f"🤖 Triggering {len(ais_to_process)} AI agents to respond: {ais_to_process}")
+        logger.info("🤖 Triggering %s AI agents to respond: %s", len(ais_to_process), ais_to_process)
         
         # Mark these AIs as processing BEFORE creating tasks
-        for ai_id in ais_to_process:
-            processing_agents.add(ai_id)
-        rooms[room_code]['ai_processing_agents'] = processing_agents
+        processing_agents |= ais_to_process
         
         # Create concurrent tasks for each AI agent
         tasks = [
@@ -609,16 +913,28 @@ async def process_ai_messages(room_code: str):
         await asyncio.gather(*tasks, return_exceptions=True)
 
 
+def _write_atomic(path: str, data: bytes):
+    """
+    Write bytes to path via a temporary file and rename, so readers never
+    see a partially written file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
 async def save_session_stats(room_code: str, state: dict) -> dict:
     """
     Save session statistics to group-chat-stats directory.
+    The payload is encoded on the event loop (while the state is consistent)
+    and written from a worker thread.
     """
     root = os.path.dirname(os.path.dirname(__file__))
     out_dir = os.path.join(root, 'group-chat-stats')
-    os.makedirs(out_dir, exist_ok=True)
-    vote_counts: Dict[str, int] = {}
-    for _, target in state.get('votes', {}).items():
-        vote_counts[target] = vote_counts.get(target, 0) + 1
+    # Abstentions (None targets) are left out, as in complete_voting
+    vote_counts = Counter(t for t in state.get('votes', {}).values() if t is not None)
     payload = {
         'room_code': room_code,
         'topic': state.get('topic'),
@@ -634,9 +950,9 @@ async def save_session_stats(room_code: str, state: dict) -> dict:
     }
     fname = f"{room_code}-{int(_time.time())}.json"
     path = os.path.join(out_dir, fname)
-    with open(path, 'w') as f:
-        json.dump(payload, f, ensure_ascii=False, indent=2)
-    rooms[room_code]['last_stats_path'] = path
+    await asyncio.to_thread(_write_atomic, path, orjson.dumps(payload, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+    if room_code in rooms:  # The room may have closed while the file was written
+        rooms[room_code]['last_stats_path'] = path
     return payload
 
 
@@ -644,12 +960,147 @@ async def save_session_stats(room_code: str, state: dict) -> dict:
 async def get_room_stats(room_code: str):
     if room_code not in rooms or 'last_stats_path' not in rooms[room_code]:
         return {'error': 'No stats for room'}
-    with open(rooms[room_code]['last_stats_path'], 'r') as f:
-        return json.load(f)
+    with open(rooms[room_code]['last_stats_path'], 'rb') as f:
+        return orjson.loads(f.read())
+
+
+async def _handle_ws_message(websocket: WebSocket, room_code: str, player_id: str, state: GameState, data: dict):
+    """Handle a chat message sent by a human over the WebSocket."""
+    message = data["message"]
+    logger.debug("💬 Human message received: %s", message)
+    
+    # Validate phase - only allow messages during discussion
+    if state['phase'] != Phase.DISCUSSION:
+        logger.warning("⚠️ Message rejected - not in discussion phase (current: %s)", state['phase'].value)
+        await ws_send(websocket, {
+            "type": "error",
+            "message": "Messages only allowed during discussion phase"
+        })
+        return
+    
+    # Update state
+    update = await process_human_message(state, message, player_id)
+    apply_state_update(state, update)
+    reset_quiet_timer(room_code)
+    
+    # Broadcast message (exclude sender since frontend shows it optimistically)
+    logger.debug("📤 Broadcasting human message to room (excluding sender)")
+    await broadcast_to_room(room_code, {
+        "type": "message",
+        "id": update["chat_history"][0]["id"],
+        "sender": player_id,
+        "message": message
+    }, exclude_player=player_id)
+    
+    # Trigger agent decision-making (they'll decide if they want to respond)
+    request_agent_decisions(room_code)
+
+
+def set_human_typing(room_code: str, player_id: str, status: str):
+    """
+    Record a human's typing status and schedule a coalesced broadcast.
+    Updates arriving within TYPING_FLUSH_DELAY of each other go out together,
+    and a start/stop pair that cancels out within the window is never sent.
+    
+    Args:
+        room_code: Room identifier
+        player_id: Player sending the typing event
+        status: 'start' or 'stop'
+    """
+    room = rooms[room_code]
+    typing_players = room['state'].setdefault('typing_players', set())
+    if status == 'start':
+        typing_players.add(player_id)
+    else:
+        typing_players.discard(player_id)
+    
+    if room.get('typing_flush') is None:
+        room['typing_flush'] = asyncio.create_task(_flush_typing(room_code))
+
+
+async def _flush_typing(room_code: str):
+    """
+    After TYPING_FLUSH_DELAY, broadcast the net typing changes since the last
+    flush as one frame.
+    
+    Args:
+        room_code: Room identifier
+    """
+    await asyncio.sleep(TYPING_FLUSH_DELAY)
+    room = rooms.get(room_code)
+    if room is None:
+        return
+    room['typing_flush'] = None
+    
+    typing_now = room['state'].get('typing_players', set())
+    announced = room.setdefault('typing_announced', set())
+    updates = [
+        {"type": "typing", "player": pid, "status": "start"}
+        for pid in typing_now - announced
+    ] + [
+        {"type": "typing", "player": pid, "status": "stop"}
+        for pid in announced - typing_now
+    ]
+    room['typing_announced'] = set(typing_now)
+    await broadcast_batch(room_code, updates)
+
+
+async def _handle_ws_typing(websocket: WebSocket, room_code: str, player_id: str, state: GameState, data: dict):
+    """Relay a human's typing indicator to the room."""
+    set_human_typing(room_code, player_id, data["status"])
+
+
+def is_valid_vote_target(state: GameState, voted_for) -> bool:
+    """
+    Check that a client-supplied vote target is the id of a live player.
+    
+    Args:
+        state: Current game state
+        voted_for: Vote target as sent by the client
+    
+    Returns:
+        True if the target can be voted for, False otherwise
+    """
+    return any(p['id'] == voted_for and not p['eliminated'] for p in state['players'])
+
+
+async def _handle_ws_vote(websocket: WebSocket, room_code: str, player_id: str, state: GameState, data: dict):
+    """Record a human vote sent over the WebSocket."""
+    voted_for = data["voted"]
+    
+    if not is_valid_vote_target(state, voted_for):
+        logger.warning("⚠️ Vote rejected - invalid target from %s: %r", player_id, voted_for)
+        await ws_send(websocket, {
+            "type": "error",
+            "message": "Invalid vote target"
+        })
+        return
+    
+    # Update state
+    apply_state_update(state, await process_human_vote(state, player_id, voted_for))
+    invalidate_players_view(room_code)
+    
+    # Broadcast vote
+    await broadcast_to_room(room_code, {
+        "type": "voted",
+        "player": player_id
+    })
+    
+    # Check if all votes are in
+    if len(state['votes']) >= active_player_count(room_code):
+        await complete_voting(room_code)
+
+
+# Client message type -> handler, used by the WebSocket receive loop
+WS_HANDLERS = {
+    "message": _handle_ws_message,
+    "typing": _handle_ws_typing,
+    "vote": _handle_ws_vote,
+}
 
 
 @app.websocket("/ws/{room_code}/{player_id}")
-async def websocket_endpoint(websocket: WebSocket, room_code: str, player_id: str):
+async def websocket_endpoint(websocket: WebSocket, room_code: str, player_id: str, last_seen_id: int = -1):
     """
     WebSocket endpoint for game connections.
     
@@ -659,11 +1110,11 @@ async def websocket_endpoint(websocket: WebSocket, room_code: str, player_id: st
         player_id: Player identifier (should be "You" for human)
     """
     await websocket.accept()
-    print(f"🔌 WebSocket accepted for player {player_id} in room {room_code}")
+    logger.info("🔌 WebSocket accepted for player %s in room %s", player_id, room_code)
     
     # Initialize room if needed
     if room_code not in rooms:
-        print(f"🎮 Creating new game room: {room_code}")
+        logger.info("🎮 Creating new game room: %s", room_code)
         
         # For legacy WebSocket rooms, use proper number assignment
         total_players = NUM_AI_PLAYERS + 1  # 1 human via WebSocket
@@ -677,26 +1128,29 @@ async def websocket_endpoint(websocket: WebSocket, room_code: str, player_id: st
         rooms[room_code] = {
             'state': state,
             'connections': {},
-            'tasks': [],
+            'tasks': set(),
             'ai_processing_agents': set(),
             'room_name': f"Room {room_code}",
             'max_humans': 4,
             'total_players': NUM_AI_PLAYERS + 4,
             'room_status': 'in_progress',  # WebSocket rooms start immediately
             'created_at': time.time(),
+            'sort_key': time.monotonic_ns(),
             'creator_id': player_id,
             'current_humans': [],
+            'humans_set': set(),
             'available_numbers': available_numbers
         }
-        # Initialize lock for this room to prevent race conditions
-        if room_code not in room_locks:
-            room_locks[room_code] = asyncio.Lock()
         
-        print(f"📝 Game state created - Topic: {state['topic']}")
+        logger.info("📝 Game state created - Topic: %s", state['topic'])
     
     # Add connection BEFORE broadcasting
-    rooms[room_code]['connections'][player_id] = websocket
-    print(f"✅ Connection added. Total connections: {len(rooms[room_code]['connections'])}")
+    subscriber = Subscriber(websocket)
+    previous = rooms[room_code]['connections'].get(player_id)
+    if previous is not None:
+        previous.close()
+    rooms[room_code]['connections'][player_id] = subscriber
+    logger.info("✅ Connection added. Total connections: %s", len(rooms[room_code]['connections']))
     
     # If this was a new room, initialize and broadcast
     state = rooms[room_code]['state']
@@ -706,107 +1160,64 @@ async def websocket_endpoint(websocket: WebSocket, room_code: str, player_id: st
         
         # Broadcast initial state
         if 'broadcast_queue' in result:
-            for msg in result['broadcast_queue']:
-                print(f"📤 Sending initial broadcast: {msg['type']}")
-                await broadcast_to_room(room_code, msg)
+            logger.info("📤 Sending initial broadcast: %s", [msg['type'] for msg in result['broadcast_queue']])
+            await broadcast_batch(room_code, result['broadcast_queue'])
         
-        rooms[room_code]['state'] = state
         rooms[room_code]['initialized'] = True
         
-        # Start discussion phase
-        asyncio.create_task(run_discussion_phase(room_code))
-        
-        # Trigger active decision-making for initial AI responses
-        # AIs will individually decide if they should start the conversation
-        await asyncio.sleep(2)  # Small delay for realism
-        asyncio.create_task(trigger_agent_decisions(room_code))
+        # Start discussion phase (which triggers the first agent decisions)
+        spawn_room_task(room_code, run_discussion_phase(room_code))
     
-    # Send current game state to the newly connected client
+    # Send current game state and the chat history the client hasn't seen yet
+    # (message ids are chat_history positions) as one frame, queued behind any
+    # broadcasts already sent to this connection
     state = rooms[room_code]['state']
-    await websocket.send_json({"type": "player_list", "players": [p["id"] for p in state["players"]]})
-    await websocket.send_json({"type": "topic", "topic": state["topic"]})
-    await websocket.send_json({"type": "phase", "phase": state["phase"].value, "message": f"Currently in {state['phase'].value}"})
-    
-    # Send chat history
-    for msg in state["chat_history"]:
-        await websocket.send_json({"type": "message", "sender": msg["sender"], "message": msg["message"]})
+    first_unseen = max(last_seen_id + 1, 0)
+    if first_unseen > len(state["chat_history"]):
+        # An id past the end comes from before a game reset: resend everything
+        first_unseen = 0
+    subscriber.enqueue(orjson.dumps({"type": "batch", "messages": [
+        {"type": "player_list", "players": [p["id"] for p in state["players"]]},
+        {"type": "topic", "topic": state["topic"]},
+        {"type": "phase", "phase": state["phase"].value, "message": f"Currently in {state['phase'].value}"},
+        {"type": "history", "messages": [
+            {"id": msg_id, "sender": msg["sender"], "message": msg["message"]}
+            for msg_id, msg in enumerate(state["chat_history"][first_unseen:], start=first_unseen)
+        ]}
+    ]}))
     
     try:
         while True:
-            data = await websocket.receive_json()
+            data = orjson.loads(await websocket.receive_text())
             
             # Check if room still exists after receiving data
             if room_code not in rooms:
-                print(f"⚠️ Room {room_code} was deleted, closing connection")
+                logger.warning("⚠️ Room %s was deleted, closing connection", room_code)
                 break
             
             state = rooms[room_code]['state']
             
-            if data["type"] == "message":
-                # Process human message
-                message = data["message"]
-                print(f"💬 Human message received: {message}")
-                
-                # Validate phase - only allow messages during discussion
-                if state['phase'] != Phase.DISCUSSION:
-                    print(f"⚠️ Message rejected - not in discussion phase (current: {state['phase'].value})")
-                    await websocket.send_json({
-                        "type": "error",
-                        "message": "Messages only allowed during discussion phase"
-                    })
-                    continue
-                
-                # Update state
-                state = await process_human_message(state, message, player_id)
-                rooms[room_code]['state'] = state
-                
-                # Broadcast message (exclude sender since frontend shows it optimistically)
-                print(f"📤 Broadcasting human message to room (excluding sender)")
-                await broadcast_to_room(room_code, {
-                    "type": "message",
-                    "sender": player_id,
-                    "message": message
-                }, exclude_player=player_id)
-                
-                # Trigger agent decision-making (they'll decide if they want to respond)
-                asyncio.create_task(trigger_agent_decisions(room_code))
-                
-            elif data["type"] == "typing":
-                status = data["status"]
-                await broadcast_to_room(room_code, {
-                    "type": "typing",
-                    "player": player_id,
-                    "status": status
-                })
-                
-            elif data["type"] == "vote":
-                # Process human vote
-                voted_for = data["voted"]
-                
-                # Update state
-                state = await process_human_vote(state, player_id, voted_for)
-                rooms[room_code]['state'] = state
-                
-                # Broadcast vote
-                await broadcast_to_room(room_code, {
-                    "type": "voted",
-                    "player": player_id
-                })
-                
-                # Check if all votes are in
-                active_players = [p['id'] for p in state['players'] if not p['eliminated']]
-                if len(state['votes']) >= len(active_players):
-                    await complete_voting(room_code)
+            handler = WS_HANDLERS.get(data.get("type"))
+            if handler is not None:
+                await handler(websocket, room_code, player_id, state, data)
     
     except WebSocketDisconnect:
-        # Remove connection
+        pass
+    
+    finally:
+        # However the loop ended (disconnect, bad frame, handler error), remove
+        # this connection unless the player has already reconnected
+        subscriber.close()
         if room_code in rooms:
-            rooms[room_code]['connections'].pop(player_id, None)
+            if rooms[room_code]['connections'].get(player_id) is subscriber:
+                rooms[room_code]['connections'].pop(player_id)
             
             # Clean up empty rooms
             if not rooms[room_code]['connections']:
+                stop_room_tasks(room_code)
+                unlist_waiting_room(room_code)
                 del rooms[room_code]
-                print(f"🗑️ Deleted room {room_code} - no connections left")
+                logger.info("🗑️ Deleted room %s - no connections left", room_code)
 
 
 @app.get("/start/{room_code}")
@@ -825,6 +1236,7 @@ async def start_game(room_code: str):
         state = create_game_for_room(room_code, NUM_AI_PLAYERS)
         rooms[room_code]['state'] = state
         rooms[room_code]['ai_processing_agents'] = set()  # Reset processing agents
+        invalidate_players_view(room_code, roster=True)
         
         # Broadcast reset
         await broadcast_to_room(room_code, {
@@ -835,42 +1247,47 @@ async def start_game(room_code: str):
         # Initialize game
         result = game_graph.initialize_game_node(state)
         state.update(result)
-        rooms[room_code]['state'] = state
         
         if 'broadcast_queue' in result:
-            for msg in result['broadcast_queue']:
-                await broadcast_to_room(room_code, msg)
+            await broadcast_batch(room_code, result['broadcast_queue'])
         
-        # Start phases
-        asyncio.create_task(run_discussion_phase(room_code))
-        # Trigger active decision-making for AI responses
-        await asyncio.sleep(1)  # Small delay
-        asyncio.create_task(trigger_agent_decisions(room_code))
+        # Start phases (the discussion phase triggers the first agent decisions)
+        spawn_room_task(room_code, run_discussion_phase(room_code))
         
         return {"message": "Game started in room"}
     
     return {"message": "Room not found"}
 
 
+# Bodies of the constant endpoints, serialized once at import
+_CONFIG_BYTES = orjson.dumps({
+    "num_ai_players": NUM_AI_PLAYERS,
+    "discussion_time": DISCUSSION_TIME,
+    "voting_time": VOTING_TIME
+})
+_CONFIG_ETAG = f'"{hashlib.blake2b(_CONFIG_BYTES, digest_size=8).hexdigest()}"'
+_HEALTH_BYTES = orjson.dumps({"status": "healthy"})
+
+
 @app.get("/config")
-async def get_config():
+async def get_config(request: Request):
     """
     Get current game configuration.
+    Answers 304 when the client's If-None-Match already holds the current ETag.
     
     Returns:
         Configuration dictionary
     """
-    return {
-        "num_ai_players": NUM_AI_PLAYERS,
-        "discussion_time": DISCUSSION_TIME,
-        "voting_time": VOTING_TIME
-    }
+    headers = {"ETag": _CONFIG_ETAG}
+    if request.headers.get("if-none-match") == _CONFIG_ETAG:
+        return Response(status_code=304, headers=headers)
+    return Response(_CONFIG_BYTES, media_type="application/json", headers=headers)
 
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "healthy"}
+    return Response(_HEALTH_BYTES, media_type="application/json")
 
 
 # ============================================================================
@@ -913,13 +1330,12 @@ async def create_room(room_data: dict):
     num_ai_players = total_players - max_humans
     
     # Generate random player numbers (shuffled 1 to total_players)
-    all_numbers = list(range(1, total_players + 1))
-    random.shuffle(all_numbers)
-    available_numbers = all_numbers.copy()
+    available_numbers = list(range(1, total_players + 1))
+    random.shuffle(available_numbers)
     
     # Assign numbers to AI players
     ai_numbers = available_numbers[:num_ai_players]
-    available_numbers = available_numbers[num_ai_players:]  # Reserve rest for humans
+    del available_numbers[:num_ai_players]  # Reserve rest for humans
     
     # Create AI player IDs with assigned numbers
     ai_player_ids = [f"Player {num}" for num in ai_numbers]
@@ -931,27 +1347,26 @@ async def create_room(room_data: dict):
     rooms[room_code] = {
         'state': state,
         'connections': {},
-        'tasks': [],
+        'tasks': set(),
         'ai_processing_agents': set(),
         'room_name': room_name,
         'max_humans': max_humans,
         'total_players': total_players,
         'room_status': 'waiting',
         'created_at': time.time(),
+        'sort_key': time.monotonic_ns(),
         'creator_id': '',  # No longer used, auto-assigned on join
         'current_humans': [],
+        'humans_set': set(),
         'available_numbers': available_numbers  # Numbers reserved for human players
     }
+    list_waiting_room(room_code)
     
-    # Initialize lock for this room
-    if room_code not in room_locks:
-        room_locks[room_code] = asyncio.Lock()
-    
-    print(f"🎮 Created room {room_code} ({room_name}): {max_humans} humans, {total_players} total")
+    logger.info("🎮 Created room %s (%s): %s humans, %s total", room_code, room_name, max_humans, total_players)
     
     # Assign a player number for the creator (they'll get it when they join)
-    # Return the first available number so they know what to expect
-    creator_number = available_numbers[0] if available_numbers else 1
+    # Joins take numbers from the end, so return the last one
+    creator_number = available_numbers[-1] if available_numbers else 1
     
     return {
         "success": True,
@@ -975,9 +1390,14 @@ async def list_rooms(page: int = 0, per_page: int = 10):
     Returns:
         Paginated list of rooms with metadata
     """
-    # Filter rooms with 'waiting' status
-    waiting_rooms = [
-        {
+    # Paginate the waiting-room index (already newest first), building only this page
+    total = len(waiting_rooms)
+    start = page * per_page
+    end = start + per_page
+    page_rooms = []
+    for _, code in waiting_rooms[start:end]:
+        data = rooms[code]
+        page_rooms.append({
             'room_code': code,
             'room_name': data['room_name'],
             'current_humans': len(data['current_humans']),
@@ -985,19 +1405,7 @@ async def list_rooms(page: int = 0, per_page: int = 10):
             'total_players': data['total_players'],
             'room_status': data['room_status'],
             'created_at': data['created_at']
-        }
-        for code, data in rooms.items()
-        if data.get('room_status') == 'waiting'
-    ]
-    
-    # Sort by created_at descending (newest first)
-    waiting_rooms.sort(key=lambda r: r['created_at'], reverse=True)
-    
-    # Paginate
-    total = len(waiting_rooms)
-    start = page * per_page
-    end = start + per_page
-    page_rooms = waiting_rooms[start:end]
+        })
     
     return {
         "rooms": page_rooms,
@@ -1062,11 +1470,11 @@ async def leave_room_endpoint(room_code: str, player_data: dict):
     creator_id = room.get('creator_id', '')
     is_creator = (player_id == creator_id) or (len(current_humans) > 0 and player_id == current_humans[0])
     
-    print(f"🚪 Player {player_id} leaving room {room_code} (creator: {is_creator})")
+    logger.info("🚪 Player %s leaving room %s (creator: %s)", player_id, room_code, is_creator)
     
     # If creator leaves or room is still in waiting status, terminate the room
     if is_creator or room_status == 'waiting':
-        print(f"🗑️ Terminating room {room_code} (creator left or in waiting status)")
+        logger.info("🗑️ Terminating room %s (creator left or in waiting status)", room_code)
         
         # Broadcast to any connected clients
         await broadcast_to_room(room_code, {
@@ -1076,9 +1484,9 @@ async def leave_room_endpoint(room_code: str, player_data: dict):
         
         # Clean up room
         if room_code in rooms:
+            stop_room_tasks(room_code)
+            unlist_waiting_room(room_code)
             del rooms[room_code]
-        if room_code in room_locks:
-            del room_locks[room_code]
         
         return {
             "success": True,
@@ -1086,33 +1494,38 @@ async def leave_room_endpoint(room_code: str, player_data: dict):
             "message": "Room terminated"
         }
     
-    # Joiner leaving: Remove from room
-    if player_id in current_humans:
+    # Joiner leaving: Remove from room (a repeated leave finds nothing to remove)
+    humans_set = room['humans_set']
+    if player_id in humans_set:
+        humans_set.discard(player_id)
         current_humans.remove(player_id)
-        print(f"👋 Removed {player_id} from room {room_code}. Remaining: {current_humans}")
-    
-    # Remove from game state
-    state = room['state']
-    state['players'] = [p for p in state['players'] if p['id'] != player_id]
+        logger.info("👋 Removed %s from room %s. Remaining: %s", player_id, room_code, current_humans)
+        
+        # Remove from game state in place rather than rebuilding the list
+        players = room['state']['players']
+        for i, p in enumerate(players):
+            if p['id'] == player_id:
+                del players[i]
+                break
+        invalidate_players_view(room_code, roster=True)
     
     # Update available numbers (add back the player's number)
-    if 'Player ' in player_id:
-        try:
-            player_num = int(player_id.split('Player ')[1])
-            available_nums = room.get('available_numbers', [])
-            if player_num not in available_nums:
-                available_nums.append(player_num)
-                room['available_numbers'] = available_nums
-        except:
-            pass
+    num_str = player_id.removeprefix('Player ') if player_id.startswith('Player ') else ''
+    if num_str.isdigit():
+        player_num = int(num_str)
+        available_nums = room.setdefault('available_numbers', [])
+        if player_num not in available_nums:
+            # Joins take from the end, so a released number goes to the front
+            # and is handed out again last
+            available_nums.insert(0, player_num)
     
     # If room becomes empty, delete it
     if len(current_humans) == 0:
-        print(f"🗑️ Room {room_code} now empty, deleting")
+        logger.info("🗑️ Room %s now empty, deleting", room_code)
         if room_code in rooms:
+            stop_room_tasks(room_code)
+            unlist_waiting_room(room_code)
             del rooms[room_code]
-        if room_code in room_locks:
-            del room_locks[room_code]
         
         return {
             "success": True,
@@ -1132,16 +1545,19 @@ async def leave_room_endpoint(room_code: str, player_data: dict):
 # ============================================================================
 
 @app.get("/api/rooms/{room_code}/state")
-async def get_room_state(room_code: str, player_id: str = "StreamlitUser"):
+async def get_room_state(room_code: str, player_id: str = "StreamlitUser", since: int = -1):
     """
     Get the current state of a room for polling-based clients (Streamlit).
     
     Args:
         room_code: Room identifier
         player_id: Player identifier (query parameter)
+        since: Id of the last chat message the client already has (query
+            parameter); only later messages are returned. -1 returns the full history.
     
     Returns:
-        Complete game state including phase, round, topic, players, chat, timer
+        Game state including phase, round, topic, players, timer, the chat
+        messages after `since`, and the id of the latest message
     """
     if room_code not in rooms:
         return {
@@ -1163,16 +1579,10 @@ async def get_room_state(room_code: str, player_id: str = "StreamlitUser"):
         "phase": state['phase'].value,
         "round": state['round'],
         "topic": state['topic'],
-        "players": [
-            {
-                "id": p['id'],
-                "role": p['role'],
-                "eliminated": p['eliminated'],
-                "voted": p['id'] in state.get('votes', {})
-            }
-            for p in state['players']
-        ],
-        "chat_history": state['chat_history'],
+        "players": get_players_view(rooms[room_code]),
+        # Message ids are positions in chat_history, so the delta is a slice
+        "chat_history": state['chat_history'][max(since + 1, 0):],
+        "last_message_id": len(state['chat_history']) - 1,
         "votes": state.get('votes', {}),
         "winner": state.get('winner'),
         "selected_suspect": state.get('selected_suspect'),
@@ -1204,7 +1614,7 @@ async def join_room(room_code: str, player_data: dict):
         all_numbers = list(range(1, total_players + 1))
         random.shuffle(all_numbers)
         human_number = all_numbers[0]
-        player_id = f"Player {human_number}"
+        player_id = sys.intern(f"Player {human_number}")
         
         # Assign remaining numbers to AI players
         ai_numbers = all_numbers[1:]
@@ -1216,31 +1626,27 @@ async def join_room(room_code: str, player_data: dict):
         rooms[room_code] = {
             'state': state,
             'connections': {},
-            'tasks': [],
+            'tasks': set(),
             'ai_processing_agents': set(),
             'room_name': f"Room {room_code}",
             'max_humans': 4,
             'total_players': total_players,
             'room_status': 'waiting',
             'created_at': time.time(),
+            'sort_key': time.monotonic_ns(),
             'creator_id': player_id,
             'current_humans': [],
+            'humans_set': set(),
             'available_numbers': []  # All assigned for legacy rooms
         }
-        # Initialize lock for this room to prevent race conditions
-        if room_code not in room_locks:
-            room_locks[room_code] = asyncio.Lock()
+        list_waiting_room(room_code)
         
         # Initialize game
         result = game_graph.initialize_game_node(state)
         state.update(result)
-        rooms[room_code]['state'] = state
         
-        # Start phases
-        asyncio.create_task(run_discussion_phase(room_code))
-        # Trigger active decision-making for AI responses
-        await asyncio.sleep(1)  # Small delay
-        asyncio.create_task(trigger_agent_decisions(room_code))
+        # Start phases (the discussion phase triggers the first agent decisions)
+        spawn_room_task(room_code, run_discussion_phase(room_code))
     
     room = rooms[room_code]
     
@@ -1264,21 +1670,22 @@ async def join_room(room_code: str, player_data: dict):
     # Assign a random player number from available numbers
     available_numbers = room.get('available_numbers', [])
     if not available_numbers:
-        # Fallback: generate a random number if somehow we run out
+        # Fallback: the reserved numbers ran out, so make up a random one
         player_number = random.randint(100, 999)
-        player_id = f"Player {player_number}"
+        player_id = sys.intern(f"Player {player_number}")
     else:
-        # Pop a random number from available
-        player_number = available_numbers.pop(0)
-        player_id = f"Player {player_number}"
+        # The list is shuffled, so taking from the end is just as random (and O(1))
+        player_number = available_numbers.pop()
+        player_id = sys.intern(f"Player {player_number}")
     
     # Add player to current_humans list
     room['current_humans'].append(player_id)
+    room['humans_set'].add(player_id)
     
     # If this is the first human to join, mark as creator
     if len(room['current_humans']) == 1:
         room['creator_id'] = player_id
-        print(f"👑 {player_id} is the creator of room {room_code}")
+        logger.info("👑 %s is the creator of room %s", player_id, room_code)
     
     # Add player to game state
     state['players'].append({
@@ -1287,36 +1694,32 @@ async def join_room(room_code: str, player_data: dict):
         'eliminated': False,
         'personality': None
     })
-    rooms[room_code]['state'] = state
+    invalidate_players_view(room_code, roster=True)
     
-    print(f"👤 Player {player_id} joined room {room_code} ({len(room['current_humans'])}/{max_humans})")
+    logger.info("👤 Player %s joined room %s (%s/%s)", player_id, room_code, len(room['current_humans']), max_humans)
     
     # Check if room is ready to start
     can_start = len(room['current_humans']) >= max_humans
     
     if can_start:
         # Update room status to in_progress
+        unlist_waiting_room(room_code)
         room['room_status'] = 'in_progress'
         
-        print(f"🎮 Starting game in room {room_code} with {len(room['current_humans'])} humans")
+        logger.info("🎮 Starting game in room %s with %s humans", room_code, len(room['current_humans']))
         
         # Initialize game if not already initialized
         if 'initialized' not in room:
             result = game_graph.initialize_game_node(state)
             state.update(result)
-            rooms[room_code]['state'] = state
             rooms[room_code]['initialized'] = True
             
             # Broadcast initial state to any connected clients
             if 'broadcast_queue' in result:
-                for msg in result['broadcast_queue']:
-                    await broadcast_to_room(room_code, msg)
+                await broadcast_batch(room_code, result['broadcast_queue'])
             
-            # Start phases
-            asyncio.create_task(run_discussion_phase(room_code))
-            # Trigger active decision-making for AI responses
-            await asyncio.sleep(1)  # Small delay
-            asyncio.create_task(trigger_agent_decisions(room_code))
+            # Start phases (the discussion phase triggers the first agent decisions)
+            spawn_room_task(room_code, run_discussion_phase(room_code))
     
     return {
         "success": True,
@@ -1357,18 +1760,20 @@ async def send_message(room_code: str, message_data: dict):
         return {"error": "Not in discussion phase"}
     
     # Process human message
-    state = await process_human_message(state, message, player_id)
-    rooms[room_code]['state'] = state
+    update = await process_human_message(state, message, player_id)
+    apply_state_update(state, update)
+    reset_quiet_timer(room_code)
     
     # Broadcast to WebSocket clients
     await broadcast_to_room(room_code, {
         "type": "message",
+        "id": update["chat_history"][0]["id"],
         "sender": player_id,
         "message": message
     })
     
     # Trigger agent decision-making (they'll decide if they want to respond)
-    asyncio.create_task(trigger_agent_decisions(room_code))
+    request_agent_decisions(room_code)
     
     return {"success": True}
 
@@ -1401,12 +1806,15 @@ async def cast_vote(room_code: str, vote_data: dict):
     if player_id in state.get('votes', {}):
         return {"error": "Already voted"}
     
+    if not is_valid_vote_target(state, voted_for):
+        return {"error": "Invalid vote target"}
+    
     # Process human vote - directly update votes dict to avoid race conditions with AI voting
     state['votes'][player_id] = voted_for
-    rooms[room_code]['state'] = state
+    invalidate_players_view(room_code)
     
-    print(f"✅ Human vote recorded: {player_id} → {voted_for}")
-    print(f"📊 Current votes after human: {state.get('votes', {})}")
+    logger.info("✅ Human vote recorded: %s → %s", player_id, voted_for)
+    logger.debug("📊 Current votes after human: %s", state.get('votes', {}))
     
     # Broadcast vote to WebSocket clients
     await broadcast_to_room(room_code, {
@@ -1415,8 +1823,7 @@ async def cast_vote(room_code: str, vote_data: dict):
     })
     
     # Check if all votes are in
-    active_players = [p['id'] for p in state['players'] if not p['eliminated']]
-    if len(state['votes']) >= len(active_players):
+    if len(state['votes']) >= active_player_count(room_code):
         await complete_voting(room_code)
     
     return {"success": True}
@@ -1440,22 +1847,7 @@ async def send_typing_status(room_code: str, typing_data: dict):
     player_id = typing_data.get('player_id', 'StreamlitUser')
     status = typing_data.get('status', 'stop')
     
-    state = rooms[room_code]['state']
-    
-    # Update typing players set
-    if 'typing_players' not in state:
-        state['typing_players'] = set()
-    
-    if status == 'start':
-        state['typing_players'].add(player_id)
-    else:
-        state['typing_players'].discard(player_id)
-    
-    # Broadcast to WebSocket clients
-    await broadcast_to_room(room_code, {
-        "type": "typing",
-        "player": player_id,
-        "status": status
-    })
+    # Update typing players set; WebSocket clients get a coalesced broadcast
+    set_human_typing(room_code, player_id, status)
     
     return {"success": True}
@@ -13,54 +13,50 @@ Usage on Streamlit Cloud:
 import os
 import sys
 import threading
-import time
 import socket
 from pathlib import Path
 
-def find_free_port(start_port=8000, max_attempts=10):
-    """Find a free port starting from start_port."""
-    for port in range(start_port, start_port + max_attempts):
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.bind(('127.0.0.1', port))
-            sock.close()
-            return port
-        except OSError:
-            continue
-    raise RuntimeError(f"Could not find a free port in range {start_port}-{start_port + max_attempts}")
+def bind_free_socket():
+    """
+    Bind a listening socket to a port chosen by the OS.
+    The socket is handed to uvicorn as-is, so no other process can take the
+    port between picking it and serving on it. It is already listening, so
+    early connections wait in the backlog until uvicorn accepts them.
+    
+    Returns:
+        (socket, port)
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(('127.0.0.1', 0))
+    # Listen right away: uvicorn signals startup before it starts serving the
+    # socket, and connections made in between must queue, not be refused
+    sock.listen(128)
+    return sock, sock.getsockname()[1]
 
-def run_backend(port=8000):
+def run_backend(sock):
     """Run the FastAPI backend server in a separate thread."""
     import uvicorn
     from backend.main import app
     
+    port = sock.getsockname()[1]
     print(f"🚀 Starting FastAPI backend on port {port}...")
     
-    # Run uvicorn server
+    # Run uvicorn server on the already-bound socket
     config = uvicorn.Config(
         app=app,
-        host="127.0.0.1",
-        port=port,
         log_level="info",
         access_log=False  # Reduce noise in logs
     )
     server = uvicorn.Server(config)
-    server.run()
+    server.run(sockets=[sock])
 
 def wait_for_backend(port=8000, timeout=30):
-    """Wait for backend to be ready."""
-    import requests
+    """Wait for the backend's startup hook to signal that it is ready."""
+    from backend.main import ready_event
     
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        try:
-            response = requests.get(f"http://127.0.0.1:{port}/health", timeout=1)
-            if response.status_code == 200:
-                print(f"✅ Backend is ready on port {port}")
-                return True
-        except:
-            pass
-        time.sleep(0.5)
+    if ready_event.wait(timeout):
+        print(f"✅ Backend is ready on port {port}")
+        return True
     
     print(f"⚠️ Backend did not start within {timeout} seconds")
     return False
@@ -97,12 +93,12 @@ def main():
     print("🎮 AI Group Chat - Combined Deployment")
     print("=" * 60)
     
-    # Find a free port for backend
+    # Bind the backend socket on a free port
     try:
-        backend_port = find_free_port(8000)
+        backend_sock, backend_port = bind_free_socket()
         print(f"📡 Using port {backend_port} for backend")
-    except RuntimeError as e:
-        print(f"❌ Error: {e}")
+    except OSError as e:
+        print(f"❌ Error: could not bind backend socket: {e}")
         sys.exit(1)
     
     # Set BACKEND_URL environment variable for streamlit_app.py
@@ -119,7 +115,7 @@ def main():
     # Start backend in a separate thread
     backend_thread = threading.Thread(
         target=run_backend,
-        args=(backend_port,),
+        args=(backend_sock,),
         daemon=True,
         name="FastAPI-Backend"
     )
@@ -137,9 +133,6 @@ def main():
     print("🎨 Starting frontend...")
     print("=" * 60)
     
-    # Small delay to ensure backend is stable
-    time.sleep(1)
-    
     # If running in Streamlit already (e.g., on Streamlit Cloud), just import the app
     # Otherwise, we need to launch Streamlit
     if is_running_in_streamlit():
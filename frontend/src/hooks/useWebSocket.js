@@ -14,16 +14,20 @@ export const useWebSocket = (roomCode, playerId, onMessage) => {
   const wsRef = useRef(null);
   const reconnectAttemptsRef = useRef(0);
   const reconnectTimeoutRef = useRef(null);
+  const lastSeenIdRef = useRef(-1); // Highest chat message id received, so reconnects skip seen history
 
   const connect = useCallback(() => {
     if (!roomCode || !playerId) return;
 
     try {
-      const wsURL = getWebSocketURL(roomCode, playerId);
+      const wsURL = getWebSocketURL(roomCode, playerId, lastSeenIdRef.current);
       console.log('🔌 Connecting to WebSocket:', wsURL);
       setStatus('connecting');
 
       const ws = new WebSocket(wsURL);
+      // The server sends UTF-8 JSON in binary frames
+      ws.binaryType = 'arraybuffer';
+      const decoder = new TextDecoder();
 
       ws.onopen = () => {
         console.log('✅ WebSocket connected');
@@ -31,13 +35,35 @@ export const useWebSocket = (roomCode, playerId, onMessage) => {
         reconnectAttemptsRef.current = 0;
       };
 
+      const dispatch = (data) => {
+        // Several server events may arrive coalesced into one frame
+        if (data.type === 'batch') {
+          data.messages.forEach(dispatch);
+          return;
+        }
+        // Chat history arrives as one frame; replay it as individual messages
+        if (data.type === 'history') {
+          data.messages.forEach((msg) => dispatch({ type: 'message', ...msg }));
+          return;
+        }
+        if (data.type === 'message' && typeof data.id === 'number') {
+          lastSeenIdRef.current = Math.max(lastSeenIdRef.current, data.id);
+        }
+        // Message ids restart at 0 with a new game
+        if (data.type === 'game_reset') {
+          lastSeenIdRef.current = -1;
+        }
+        if (onMessage) {
+          onMessage(data);
+        }
+      };
+
       ws.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data);
+          const text = typeof event.data === 'string' ? event.data : decoder.decode(event.data);
+          const data = JSON.parse(text);
           console.log('📥 WebSocket message:', data.type);
-          if (onMessage) {
-            onMessage(data);
-          }
+          dispatch(data);
         } catch (err) {
           console.error('Error parsing WebSocket message:', err);
         }
@@ -53,8 +79,10 @@ export const useWebSocket = (roomCode, playerId, onMessage) => {
         setStatus('disconnected');
         wsRef.current = null;
 
-        // Attempt reconnection if not a clean close
-        if (!event.wasClean && reconnectAttemptsRef.current < MAX_RECONNECT_ATTEMPTS) {
+        // Attempt reconnection if not a clean close, or if the server dropped
+        // us for falling behind (1013) and expects a resync
+        const shouldReconnect = !event.wasClean || event.code === 1013;
+        if (shouldReconnect && reconnectAttemptsRef.current < MAX_RECONNECT_ATTEMPTS) {
           reconnectAttemptsRef.current += 1;
           console.log(`🔄 Reconnecting (attempt ${reconnectAttemptsRef.current}/${MAX_RECONNECT_ATTEMPTS})...`);
           
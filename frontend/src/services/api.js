@@ -133,10 +133,10 @@ export const roomAPI = {
  * @param {string} playerId - Player ID
  * @returns {string} WebSocket URL
  */
-export const getWebSocketURL = (roomCode, playerId) => {
+export const getWebSocketURL = (roomCode, playerId, lastSeenId = -1) => {
   const wsProtocol = BACKEND_URL.startsWith('https') ? 'wss' : 'ws';
   const baseURL = BACKEND_URL.replace(/^https?:\/\//, '');
-  return `${wsProtocol}://${baseURL}/ws/${roomCode}/${playerId}`;
+  return `${wsProtocol}://${baseURL}/ws/${roomCode}/${playerId}?last_seen_id=${lastSeenId}`;
 };
 
 export default api;